@@ -0,0 +1,34 @@
+"""add resume_snapshot table
+
+Revision ID: 4c1e7b2a9d36
+Revises: 903548454509
+Create Date: 2026-10-18 10:12:31.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c1e7b2a9d36'
+down_revision: Union[str, None] = '903548454509'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'resume_snapshot',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('data', sa.Text(), nullable=True),
+        sa.Column('built_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('resume_snapshot')
@@ -0,0 +1,87 @@
+"""add start_month and end_month to experience
+
+Revision ID: 7d2f0c5e8a41
+Revises: 4c1e7b2a9d36
+Create Date: 2026-10-18 14:05:12.518342
+
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2f0c5e8a41'
+down_revision: Union[str, None] = '4c1e7b2a9d36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+# Разбор заморожен здесь, а не импортирован из app.experience:
+# миграция должна давать тот же результат и после правок приложения
+PERIOD_MONTH_RE = re.compile(r"(\d{1,2})\s*[./]\s*(\d{4})")
+ISO_MONTH_RE = re.compile(r"(\d{4})-(\d{1,2})")
+PERIOD_SEPARATOR_RE = re.compile(r"\s*[—–]\s*|\s+-\s+")
+PRESENT_MARKERS = ("н.в", "наст", "сейчас", "present", "now")
+
+
+def parse_month(value):
+    if not value:
+        return None
+    match = ISO_MONTH_RE.search(value)
+    if match:
+        year, month = int(match.group(1)), int(match.group(2))
+    else:
+        match = PERIOD_MONTH_RE.search(value)
+        if not match:
+            return None
+        month, year = int(match.group(1)), int(match.group(2))
+    if not 1 <= month <= 12:
+        return None
+    return year * 12 + month - 1
+
+
+def experience_months(period, start_date, end_date):
+    start_text, end_text = (PERIOD_SEPARATOR_RE.split(period or "", maxsplit=1) + [""])[:2]
+    start = parse_month(start_date) or parse_month(start_text)
+    if start is None:
+        return None, None
+    end = parse_month(end_date) or parse_month(end_text)
+    if end is None and not any(marker in end_text.lower() for marker in PRESENT_MARKERS):
+        end = start
+    return start, end
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("experience", sa.Column("start_month", sa.Integer(), nullable=True))
+    op.add_column("experience", sa.Column("end_month", sa.Integer(), nullable=True))
+
+    # Заполняем пачками по id: неразобранные периоды остаются NULL
+    # и не зацикливают выборку
+    bind = op.get_bind()
+    select = sa.text(
+        "SELECT id, period, start_date, end_date FROM experience"
+        " WHERE id > :last_id ORDER BY id LIMIT :limit"
+    )
+    update = sa.text("UPDATE experience SET start_month = :start_month, end_month = :end_month WHERE id = :id")
+    last_id = 0
+    while True:
+        rows = bind.execute(select, {"last_id": last_id, "limit": BATCH_SIZE}).all()
+        if not rows:
+            break
+        params = []
+        for row in rows:
+            start_month, end_month = experience_months(row.period, row.start_date, row.end_date)
+            params.append({"id": row.id, "start_month": start_month, "end_month": end_month})
+        bind.execute(update, params)
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("experience", "end_month")
+    op.drop_column("experience", "start_month")
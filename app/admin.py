@@ -1,84 +1,72 @@
 from fastapi import APIRouter, Depends, Request, Form, UploadFile, File
-from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse, StreamingResponse, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from .database import SessionLocal, pwd_context
-from passlib import hash
-from .auth import require_login
+from .database import engine, get_db, run_read, resume_changed, pwd_context
+from .backup import iter_backup
+from .export import iter_export, EXPORT_FORMATS
+from .photo import process_photo, prune_photo_variants, MAX_PHOTO_BYTES
+from .uploads import (
+    receive_upload, store_upload, make_thumbnail, thumbnail_url, finish_upload,
+    referenced_files, release_files,
+    UploadRejected, IMAGE_TYPES, CERTIFICATE_TYPES, MAX_CERTIFICATE_BYTES,
+)
+from starlette.concurrency import run_in_threadpool
+from .auth import require_login, login_guard
+from .cache import page_cache
+from .twofa import qr_cache, provisioning_uri
+from .info_store import info_store
+from .http_cache import is_not_modified, not_modified
+from .stats import get_resume_stats
 from .models import Experience, Course, Skill, Info, Education, Language, Project, Certificate, Recommendation, Admin
-from fastapi.templating import Jinja2Templates
-templates = Jinja2Templates(directory="templates")
+from .templating import templates
 from datetime import datetime
 import shutil
 import os
-import tempfile
 import json
-import zipfile
 import io
 from pathlib import Path
-import pyotp 
 import secrets
-from jinja2 import pass_context
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-@pass_context
-def nl2br(ctx, value):
-    return value.replace('\n', '<br>')
-
-templates.env.filters['nl2br'] = nl2br
-
 @router.get("/admin")
 def admin_home_redirect():
     return RedirectResponse(url="/admin/dashboard", status_code=303)
 
 @router.get("/admin/dashboard", response_class=HTMLResponse)
-def admin_dashboard(request: Request, db: Session = Depends(get_db)):
+async def admin_dashboard(request: Request):
     auth_redirect = require_login(request)
     if auth_redirect: return auth_redirect
 
-    stats = {
-        "skills": db.query(Skill).count(),
-        "experience": db.query(Experience).count(),
-        "education": db.query(Education).count(),
-        "courses": db.query(Course).count(),
-        "languages": db.query(Language).count(),
-        "projects": db.query(Project).count(),
-        "certificates": db.query(Certificate).count(),
-        "recommendations": db.query(Recommendation).count()
-    }
-
-    latest_dates = []
-
-    for model in [Experience, Skill, Education, Course, Language, Project, Certificate, Recommendation]:
-        dt = db.query(func.max(model.updated_at)).scalar()
-        if dt:
-            latest_dates.append(dt)
-
-    resume_updated = max(latest_dates) if latest_dates else None
+    stats, resume_updated = await run_read(get_resume_stats)
 
     return templates.TemplateResponse("admin_dashboard.html", {
         "request": request,
         "stats": stats,
-        "resume_updated": resume_updated
+        "resume_updated": resume_updated,
+        "cache": page_cache.stats(),
+        "logins": login_guard.stats()
     })
 
+@router.post("/admin/cache/purge")
+def purge_cache(request: Request):
+    auth_redirect = require_login(request)
+    if auth_redirect: return auth_redirect
+
+    page_cache.purge()
+    return RedirectResponse(url="/admin/dashboard", status_code=303)
+
 @router.post("/admin/reset")
 def reset_resume(request: Request, db: Session = Depends(get_db)):
     auth_redirect = require_login(request)
     if auth_redirect: return auth_redirect
 
+    file_urls = referenced_files(db)
     for model in [Experience, Skill, Info, Course, Education, Language, Project, Certificate, Recommendation]:
         db.query(model).delete()
 
     db.commit()
+    release_files(db, file_urls)
     return RedirectResponse(url="/admin", status_code=303)
 
 @router.get("/admin/backup")
@@ -86,56 +74,29 @@ def download_backup(request: Request):
     auth_redirect = require_login(request)
     if auth_redirect: return auth_redirect
 
-    buffer = io.BytesIO()
-    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
-        zipf.write("resume.db", arcname="resume.db")
-
-        upload_dir = Path("static/uploads")
-        for file in upload_dir.glob("*"):
-            zipf.write(file, arcname=f"uploads/{file.name}")
-
-    buffer.seek(0)
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     filename = f"backup_{timestamp}.zip"
 
-    return StreamingResponse(buffer, media_type="application/zip", headers={
+    return StreamingResponse(iter_backup(engine.url.database), media_type="application/zip", headers={
         "Content-Disposition": f"attachment; filename={filename}"
     })
 
 @router.get("/admin/export-json")
-def export_json(request: Request, db: Session = Depends(get_db)):
-    auth_redirect = require_login(request)
-    if auth_redirect: return auth_redirect
-
-    def serialize(obj):
-        result = {}
-        for col in obj.__table__.columns:
-            value = getattr(obj, col.name)
-            if isinstance(value, datetime):
-                value = value.isoformat()
-            result[col.name] = value
-        return result
-
-    data = {
-        "info": [serialize(i) for i in db.query(Info).all()],
-        "experience": [serialize(e) for e in db.query(Experience).all()],
-        "skills": [serialize(s) for s in db.query(Skill).all()],
-        "courses": [serialize(c) for c in db.query(Course).all()],
-        "educations": [serialize(e) for e in db.query(Education).all()],
-        "languages": [serialize(l) for l in db.query(Language).all()],
-        "projects": [serialize(p) for p in db.query(Project).all()],
-        "certificates": [serialize(c) for c in db.query(Certificate).all()],
-        "recommendations": [serialize(r) for r in db.query(Recommendation).all()],
-    }
+async def export_json(request: Request, format: str = "pretty"):
+    auth_redirect = require_login(request)
+    if auth_redirect: return auth_redirect
+
+    if format not in EXPORT_FORMATS:
+        return HTMLResponse("Неизвестный формат экспорта", status_code=400)
+    media_type, extension = EXPORT_FORMATS[format]
 
     now = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    filename = f"resume_{now}.json"
+    filename = f"resume_{now}.{extension}"
+
+    return StreamingResponse(iter_export(format), media_type=media_type, headers={
+        "Content-Disposition": f"attachment; filename={filename}"
+    })
 
-    with tempfile.NamedTemporaryFile(mode="w+", delete=False, suffix=".json") as tmp:
-        json.dump(data, tmp, indent=4, ensure_ascii=False)
-        tmp.flush()
-        return FileResponse(tmp.name, filename=filename, media_type="application/json")
-    
 @router.get("/admin/import-json", response_class=HTMLResponse)
 def show_import_page(request: Request, db: Session = Depends(get_db)):
     auth_redirect = require_login(request)
@@ -149,74 +110,30 @@ def show_import_page(request: Request, db: Session = Depends(get_db)):
 async def import_json(
     request: Request,
     json_file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    dry_run: str = Form(None),
+    mode: str = Form("replace"),
+    delete_missing: str = Form(None)
 ):
     auth_redirect = require_login(request)
     if auth_redirect: return auth_redirect
 
-    try:
-        content = await json_file.read()
-        data = json.loads(content)
-    except Exception:
-        return templates.TemplateResponse("admin_import_json.html", {
-            "request": request,
-            "json_error": "Невалидный JSON-файл"
-        })
-
-    db.query(Info).delete()
-    db.query(Skill).delete()
-    db.query(Experience).delete()
-    db.query(Course).delete()
-    db.query(Education).delete()
-    db.query(Language).delete()
-    db.query(Project).delete()
-    db.query(Certificate).delete()
-    db.query(Recommendation).delete()
-    db.commit()
-
-    allowed = {
-        "info": ["field", "value"],
-        "skills": ["name"],
-        "experience": ["company", "role", "period", "description"],
-        "courses": ["title", "organization", "year"],
-        "educations": ["degree", "institution", "start_date", "end_date", "specialization"],
-        "languages": ["name", "level"],
-        "projects": ["title", "description", "link", "stack"],
-        "certificates": ["title", "issuer", "year", "file_path", "link"],
-        "recommendations": ["name", "company", "quote"]
-    }
-
-    models = {
-        "skills": Skill,
-        "experience": Experience,
-        "courses": Course,
-        "educations": Education,
-        "languages": Language,
-        "projects": Project,
-        "certificates": Certificate,
-        "recommendations": Recommendation
-    }
-
-    def clean(item, fields):
-        return {k: v for k, v in item.items() if k in fields}
-
-    if "info" in data:
-        for item in data["info"]:
-            db.add(Info(**clean(item, allowed["info"])))
+    from .importer import import_resume
 
-    for key, model in models.items():
-        for item in data.get(key, []):
-            try:
-                db.add(model(**clean(item, allowed[key])))
-            except Exception as e:
-                print(f"Ошибка в {key}: {e}")
-
-    db.commit()
+    report = await run_in_threadpool(
+        import_resume, json_file.file,
+        dry_run=dry_run == "on",
+        mode="merge" if mode == "merge" else "replace",
+        delete_missing=delete_missing == "on",
+    )
 
-    return templates.TemplateResponse("admin_import_json.html", {
-        "request": request,
-        "json_success": "Резюме успешно импортировано"
-    })
+    context = {"request": request, "report": report}
+    if report["errors"]:
+        context["json_error"] = "Импорт отменён, резюме не изменено"
+    elif report["dry_run"]:
+        context["json_success"] = "Проверка пройдена, файл можно импортировать"
+    else:
+        context["json_success"] = "Резюме успешно импортировано"
+    return templates.TemplateResponse("admin_import_json.html", context)
 
 
 @router.post("/admin/experience/delete")
@@ -348,7 +265,7 @@ def recover_form(request: Request, db: Session = Depends(get_db)):
     return templates.TemplateResponse("recover.html", {"request": request, "question": question, "admin": admin})
 
 @router.post("/recover", response_class=HTMLResponse)
-async def recover_post(
+def recover_post(
     request: Request,
     answer: str = Form(...),
     totp: str = Form(...),
@@ -362,6 +279,8 @@ async def recover_post(
         })
 
     if admin.twofa_enabled:
+        import pyotp
+
         totp_obj = pyotp.TOTP(admin.totp_secret)
         if not totp_obj.verify(totp):
             return templates.TemplateResponse("recover.html", {
@@ -392,6 +311,8 @@ def enable_2fa(
     if not admin or not admin.totp_secret:
         return RedirectResponse("/admin/settings", status_code=303)
 
+    import pyotp
+
     totp = pyotp.TOTP(admin.totp_secret)
 
     if totp.verify(code.strip()):
@@ -411,6 +332,7 @@ def disable_2fa(request: Request, db: Session = Depends(get_db)):
         admin.twofa_enabled = False
         admin.totp_secret = None
         db.commit()
+        qr_cache.purge()
 
     return RedirectResponse("/admin/settings?disabled_2fa=true", status_code=303)
 
@@ -464,14 +386,14 @@ def delete_course(request: Request, id: int, db: Session = Depends(get_db)):
 def edit_info_page(request: Request, db: Session = Depends(get_db)):
     auth_redirect = require_login(request)
     if auth_redirect: return auth_redirect
-    infos = {i.field: i.value for i in db.query(Info).all()}
+    infos = info_store.get_all(db)
     return templates.TemplateResponse("admin_info.html", {"request": request, "info": infos})
 
 
 from fastapi import File, UploadFile
 
 @router.post("/admin/info")
-async def update_info(
+def update_info(
     request: Request,
     name: str = Form(""),
     position: str = Form(""),
@@ -509,12 +431,7 @@ async def update_info(
         "location": location,
     }
 
-    for field, value in fields.items():
-        record = db.query(Info).filter(Info.field == field).first()
-        if record:
-            record.value = value
-        else:
-            db.add(Info(field=field, value=value))
+    info_store.save(db, fields)
     db.commit()
 
     return RedirectResponse(url="/admin/info", status_code=303)
@@ -527,33 +444,42 @@ def show_settings(request: Request, db: Session = Depends(get_db)):
 
     admin = db.query(Admin).first()
 
-    import pyotp, qrcode, io, base64
-
     if not admin.totp_secret:
-        secret = pyotp.random_base32()
-        admin.totp_secret = secret
-        db.commit()
-    else:
-        secret = admin.totp_secret
+        import pyotp
 
-    totp_uri = pyotp.TOTP(secret).provisioning_uri(name=admin.username, issuer_name="CVaaS")
-    img = qrcode.make(totp_uri)
-    buffer = io.BytesIO()
-    img.save(buffer, format="PNG")
-    qr_base64 = base64.b64encode(buffer.getvalue()).decode()
+        admin.totp_secret = pyotp.random_base32()
+        db.commit()
+        qr_cache.purge()
 
-    infos = {i.field: i.value for i in db.query(Info).all()}
+    infos = info_store.get_all(db)
     json_status = request.session.pop("json_status", None)
 
     return templates.TemplateResponse("admin_settings.html", {
         "request": request,
         "info": infos,
         "admin": admin,
-        "qr_base64": qr_base64,
+        "qr_url": "/admin/2fa/qr.png",
         "json_success": json_status[1] if json_status and json_status[0] == "success" else None,
         "json_error": json_status[1] if json_status and json_status[0] == "error" else None
     })
 
+@router.get("/admin/2fa/qr.png")
+async def twofa_qr(request: Request):
+    auth_redirect = require_login(request)
+    if auth_redirect: return auth_redirect
+
+    admin = await run_read(lambda db: db.query(Admin).first())
+    if not admin or not admin.totp_secret or admin.twofa_enabled:
+        return Response(status_code=404)
+
+    uri = provisioning_uri(admin)
+    # Ответ содержит секрет: только в кэше браузера и с перепроверкой
+    headers = {"ETag": f'"{qr_cache.key(uri)}"', "Cache-Control": "private, no-cache"}
+    if is_not_modified(request.headers, headers):
+        return not_modified(headers)
+    png = await run_in_threadpool(qr_cache.get_png, uri)
+    return Response(png, media_type="image/png", headers=headers)
+
 @router.post("/admin/change-security-question")
 def change_security_question(
     request: Request,
@@ -576,7 +502,7 @@ def change_security_question(
 
     db.commit()
 
-    info = {i.field: i.value for i in db.query(Info).all()}
+    info = info_store.get_all(db)
     response = templates.TemplateResponse("admin_settings.html", {
         "request": request,
         "admin": admin,
@@ -588,46 +514,44 @@ def change_security_question(
 
 
 @router.post("/admin/settings")
-async def update_settings(request: Request, db: Session = Depends(get_db)):
+def update_settings(
+    request: Request,
+    template: str = Form("classic"),
+    visibility: str = Form(None),
+    hidden_message: str = Form(""),
+    db: Session = Depends(get_db)
+):
     auth_redirect = require_login(request)
     if auth_redirect: return auth_redirect
 
-    form = await request.form()
-
     fields = {
-        "template": form.get("template", "classic"),
-        "visibility": "public" if form.get("visibility") == "public" else "hidden",
-        "hidden_message": form.get("hidden_message", "")
+        "template": template,
+        "visibility": "public" if visibility == "public" else "hidden",
+        "hidden_message": hidden_message
     }
 
-    for field, value in fields.items():
-        record = db.query(Info).filter(Info.field == field).first()
-        if record:
-            record.value = value
-        else:
-            db.add(Info(field=field, value=value))
+    info_store.save(db, fields)
     db.commit()
 
     return RedirectResponse(url="/admin/settings", status_code=303)
 
 @router.post("/admin/change-credentials")
-async def change_credentials(
+def change_credentials(
     request: Request,
     current_password: str = Form(...),
     new_username: str = Form(...),
     new_password: str = Form(""),
-    confirm_password: str = Form("")
+    confirm_password: str = Form(""),
+    db: Session = Depends(get_db)
 ):
     auth_redirect = require_login(request)
     if auth_redirect:
         return auth_redirect
 
-    db = SessionLocal()
     admin = db.query(Admin).first()
-    info = {i.field: i.value for i in db.query(Info).all()}
+    info = info_store.get_all(db)
 
     if not admin:
-        db.close()
         return RedirectResponse("/login", status_code=302)
 
     if not pwd_context.verify(current_password, admin.password_hash):
@@ -637,7 +561,6 @@ async def change_credentials(
             "info": info,
             "cred_error": "❌ Неверный текущий пароль"
         })
-        db.close()
         return response
 
     if new_password and new_password != confirm_password:
@@ -647,7 +570,6 @@ async def change_credentials(
             "info": info,
             "cred_error": "❌ Пароли не совпадают"
         })
-        db.close()
         return response
 
     admin.username = new_username
@@ -655,6 +577,7 @@ async def change_credentials(
         admin.password_hash = pwd_context.hash(new_password)
 
     db.commit()
+    qr_cache.purge()
     request.session["user"] = new_username
 
     response = templates.TemplateResponse("admin_settings.html", {
@@ -663,7 +586,6 @@ async def change_credentials(
         "info": info,
         "cred_success": "✅ Данные администратора обновлены"
     })
-    db.close()
     return response
 
 
@@ -757,8 +679,20 @@ async def upload_photo(
     if auth_redirect: return auth_redirect
 
     if photo and photo.filename:
-        content = await photo.read()
-        Path("static/uploads/photo.jpg").write_bytes(content)
+        from PIL.Image import DecompressionBombError
+
+        try:
+            tmp_path, digest, _ = await receive_upload(photo, MAX_PHOTO_BYTES, IMAGE_TYPES)
+        except UploadRejected as e:
+            return HTMLResponse(str(e), status_code=e.status_code)
+        try:
+            await run_in_threadpool(process_photo, tmp_path, digest)
+        except (OSError, DecompressionBombError):
+            return HTMLResponse("Не удалось распознать изображение", status_code=400)
+        finally:
+            os.remove(tmp_path)
+        resume_changed()
+        await run_in_threadpool(prune_photo_variants)
 
     return RedirectResponse(url="/admin/info", status_code=303)
 
@@ -845,11 +779,12 @@ def view_certificates(request: Request, db: Session = Depends(get_db)):
     certificates = db.query(Certificate).all()
     return templates.TemplateResponse("admin_certificates.html", {
         "request": request,
-        "certificates": certificates
+        "certificates": certificates,
+        "thumbnails": {c.id: thumbnail_url(c.file_path) for c in certificates},
     })
 
 @router.post("/admin/certificates/add")
-def add_certificate(
+async def add_certificate(
     request: Request,
     title: str = Form(...),
     issuer: str = Form(...),
@@ -862,15 +797,28 @@ def add_certificate(
     if auth_redirect: return auth_redirect
 
     file_path = ""
-    if file:
-        dest = f"static/uploads/certificates/{file.filename}"
-        with open(dest, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        file_path = "/" + dest
-
-    cert = Certificate(title=title, issuer=issuer, year=year, link=link or None, file_path=file_path or None)
-    db.add(cert)
-    db.commit()
+    if file and file.filename:
+        try:
+            tmp_path, digest, kind = await receive_upload(file, MAX_CERTIFICATE_BYTES, CERTIFICATE_TYPES)
+        except UploadRejected as e:
+            return HTMLResponse(str(e), status_code=e.status_code)
+        file_path = await run_in_threadpool(store_upload, tmp_path, digest, kind)
+        await run_in_threadpool(make_thumbnail, file_path)
+
+    def save():
+        db.add(Certificate(title=title, issuer=issuer, year=year, link=link or None, file_path=file_path or None))
+        db.commit()
+
+    def finish():
+        # После ошибки коммита сессия ждёт отката, после успешного он ничего не делает
+        db.rollback()
+        finish_upload(db, file_path)
+
+    try:
+        await run_in_threadpool(save)
+    finally:
+        if file_path:
+            await run_in_threadpool(finish)
     return RedirectResponse(url="/admin/certificates", status_code=303)
 
 @router.get("/admin/certificates/delete/{id}")
@@ -879,10 +827,10 @@ def delete_certificate(id: int, request: Request, db: Session = Depends(get_db))
     if auth_redirect: return auth_redirect
     cert = db.query(Certificate).get(id)
     if cert:
-        if cert.file_path and os.path.exists(cert.file_path[1:]):
-            os.remove(cert.file_path[1:])
+        file_path = cert.file_path
         db.delete(cert)
         db.commit()
+        release_files(db, [file_path])
     return RedirectResponse(url="/admin/certificates", status_code=303)
 
 @router.get("/admin/recommendations", response_class=HTMLResponse)
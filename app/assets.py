@@ -0,0 +1,151 @@
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import re
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = Path("static")
+DIST_DIR = STATIC_DIR / "dist"
+DIST_URL = "/static/dist/"
+MANIFEST_PATH = DIST_DIR / "manifest.json"
+
+# Загрузки пользователя и сама сборка не фингерпринтятся
+SKIP_DIRS = ("uploads", "dist")
+COMPRESSIBLE_SUFFIXES = (".css", ".js", ".svg", ".json", ".txt", ".xml", ".html", ".ico", ".ttf", ".otf")
+MIN_COMPRESS_SIZE = 256
+CSS_URL_RE = re.compile(r"""url\((['"]?)([^'")]+)\1\)""")
+
+_manifest = None
+_manifest_digest = None
+
+
+def fingerprinted_name(path: Path, digest: str) -> str:
+    return f"{path.stem}.{digest[:12]}{path.suffix}"
+
+
+def write_atomic(path: Path, data: bytes):
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def rewrite_css_urls(data: bytes, relative: Path, manifest: dict) -> bytes:
+    base = posixpath.dirname(relative.as_posix())
+
+    def replace(match):
+        quote, url = match.group(1), match.group(2)
+        if url.startswith(("data:", "http:", "https:", "//", "#")):
+            return match.group(0)
+        path = url.split("?")[0]
+        if path.startswith("/static/"):
+            target = path[len("/static/"):]
+        else:
+            target = posixpath.normpath(posixpath.join(base, path))
+        built = manifest.get(target)
+        if built is None:
+            return match.group(0)
+        return f"url({quote}{posixpath.relpath(built, base or '.')}{quote})"
+
+    return CSS_URL_RE.sub(replace, data.decode("utf-8")).encode("utf-8")
+
+
+def precompress(path: Path, data: bytes):
+    """
+    Brotli (quality 11) и zopfli-gzip: медленно, но один раз при сборке.
+    Вариант сохраняется, только если он меньше исходника.
+    """
+    import brotli
+    import zopfli.gzip
+
+    for suffix, compress in ((".br", lambda d: brotli.compress(d, quality=11)), (".gz", zopfli.gzip.compress)):
+        target = path.with_name(path.name + suffix)
+        if target.exists():
+            continue
+        compressed = compress(data)
+        if len(compressed) < len(data):
+            write_atomic(target, compressed)
+
+
+def build_assets() -> dict:
+    """
+    Копирует файлы static/ в static/dist/ с хэшем содержимого в имени,
+    сжимает текстовые и пишет manifest.json {исходный путь: путь в dist}.
+    Повторный запуск без изменений ничего не пересобирает.
+    """
+    global _manifest, _manifest_digest
+
+    manifest = {}
+    DIST_DIR.mkdir(parents=True, exist_ok=True)
+    # CSS собирается последним: ссылки url(...) в нём переписываются
+    # на уже посчитанные имена шрифтов и картинок
+    sources = sorted(STATIC_DIR.rglob("*"), key=lambda p: (p.suffix == ".css", p))
+    for source in sources:
+        relative = source.relative_to(STATIC_DIR)
+        if not source.is_file() or relative.parts[0] in SKIP_DIRS or source.name.startswith("."):
+            continue
+        data = source.read_bytes()
+        if source.suffix == ".css":
+            data = rewrite_css_urls(data, relative, manifest)
+        name = relative.with_name(fingerprinted_name(relative, hashlib.sha256(data).hexdigest()))
+        target = DIST_DIR / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if not target.exists():
+            write_atomic(target, data)
+        if source.suffix in COMPRESSIBLE_SUFFIXES and len(data) >= MIN_COMPRESS_SIZE:
+            precompress(target, data)
+        manifest[relative.as_posix()] = name.as_posix()
+
+    write_atomic(MANIFEST_PATH, json.dumps(manifest, indent=2, sort_keys=True).encode())
+
+    # Старые версии ассетов больше не нужны: ссылки на них уже не отдаются
+    keep = {MANIFEST_PATH.name} | set(manifest.values())
+    for built in DIST_DIR.rglob("*"):
+        name = built.relative_to(DIST_DIR).as_posix()
+        if built.is_file() and name.removesuffix(".br").removesuffix(".gz") not in keep:
+            built.unlink()
+
+    _manifest = manifest
+    _manifest_digest = None
+    return manifest
+
+
+def load_manifest() -> dict:
+    global _manifest
+    if _manifest is None:
+        try:
+            _manifest = json.loads(MANIFEST_PATH.read_text())
+        except (OSError, ValueError):
+            return {}
+    return _manifest
+
+
+def manifest_digest() -> str:
+    """
+    Хэш манифеста: меняется вместе с URL ассетов, которые попадают в HTML.
+    """
+    global _manifest_digest
+    if _manifest_digest is None:
+        manifest = json.dumps(load_manifest(), sort_keys=True).encode()
+        _manifest_digest = hashlib.sha256(manifest).hexdigest()
+    return _manifest_digest
+
+
+def asset_url(name: str) -> str:
+    """
+    URL ассета для шаблонов: {{ asset_url("style.css") }}.
+    Пока сборки нет (dev), отдаёт исходный файл из /static/.
+    """
+    built = load_manifest().get(name)
+    if built is None:
+        return f"/static/{name}"
+    return DIST_URL + built
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    built = build_assets()
+    logger.info("Собрано ассетов: %d", len(built))
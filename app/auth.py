@@ -1,12 +1,13 @@
 from fastapi import Request, Form
 from fastapi.responses import RedirectResponse, HTMLResponse
 from fastapi.routing import APIRouter
-from fastapi.templating import Jinja2Templates
-from .database import SessionLocal, pwd_context
+from .database import run_read, pwd_context
 from .models import Admin
+from .templating import templates
+from .throttle import LoginGuard, VerifierBusy
 
-templates = Jinja2Templates(directory="templates")
 router = APIRouter()
+login_guard = LoginGuard(pwd_context)
 
 def is_logged_in(request: Request):
     return request.session.get("user") is not None
@@ -20,23 +21,37 @@ def login_form(request: Request):
     return templates.TemplateResponse("login.html", {"request": request})
 
 @router.post("/login")
-def login(
+async def login(
     request: Request,
     username: str = Form(...),
-    password: str = Form(...)
+    password: str = Form(...),
 ):
-    db = SessionLocal()
-    admin = db.query(Admin).filter(Admin.username == username).first()
-    db.close()
-
-    if admin and pwd_context.verify(password, admin.password_hash):
+    client_ip = request.client.host if request.client else "unknown"
+    retry_after = login_guard.check(client_ip, username.strip().lower())
+    if retry_after:
+        return login_error(request, "Слишком много попыток входа, попробуйте позже", 429, retry_after)
+
+    admin = await run_read(lambda db: db.query(Admin).filter(Admin.username == username).first())
+    try:
+        ok = await login_guard.verify(client_ip, username.strip().lower(), password,
+                                      admin.password_hash if admin else None)
+    except VerifierBusy:
+        return login_error(request, "Сервер перегружен, попробуйте через несколько секунд", 429, 1)
+
+    if ok:
         request.session["user"] = username
         return RedirectResponse(url="/admin", status_code=303)
 
-    return templates.TemplateResponse("login.html", {
+    return login_error(request, "Неверный логин или пароль", 401)
+
+def login_error(request: Request, error: str, status_code: int, retry_after: int = 0):
+    response = templates.TemplateResponse("login.html", {
         "request": request,
-        "error": "Неверный логин или пароль"
-    }, status_code=401)
+        "error": error
+    }, status_code=status_code)
+    if retry_after:
+        response.headers["Retry-After"] = str(retry_after)
+    return response
 
 @router.get("/logout")
 def logout(request: Request):
@@ -0,0 +1,101 @@
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+CHUNK_SIZE = 64 * 1024
+
+# Эти форматы уже сжаты, повторный deflate только тратит CPU
+STORED_SUFFIXES = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".pdf", ".zip", ".gz", ".br", ".woff2"}
+
+
+class ZipStream(io.RawIOBase):
+    """
+    Несикабельный приёмник для ZipFile: накапливает записанные байты
+    до следующего drain(), чтобы архив можно было отдавать по частям.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def snapshot_database(db_path: str) -> str:
+    """
+    Согласованная копия базы через online backup API SQLite,
+    даже если приложение в этот момент пишет в неё.
+    """
+    fd, tmp_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    src = sqlite3.connect(db_path)
+    dst = sqlite3.connect(tmp_path)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+    return tmp_path
+
+
+def iter_backup(db_path: str, upload_dir: str = "static/uploads"):
+    """
+    Потоково отдаёт zip-архив: база, все загрузки (включая подпапки)
+    и manifest.json с размером и SHA-256 каждого файла.
+    """
+    tmp_db = snapshot_database(db_path)
+    try:
+        files = [(Path(tmp_db), "resume.db")]
+        upload_root = Path(upload_dir)
+        if upload_root.is_dir():
+            files += [
+                (path, f"uploads/{path.relative_to(upload_root).as_posix()}")
+                # .tmp рядом с файлами — недописанные копии (см. uploads.move_into)
+                for path in sorted(upload_root.rglob("*")) if path.is_file() and not path.name.startswith(".")
+            ]
+
+        stream = ZipStream()
+        manifest = {"created_at": datetime.now().isoformat(), "files": {}}
+        with zipfile.ZipFile(stream, "w") as zipf:
+            for path, arcname in files:
+                zinfo = zipfile.ZipInfo.from_file(path, arcname)
+                if path.suffix.lower() in STORED_SUFFIXES:
+                    zinfo.compress_type = zipfile.ZIP_STORED
+                else:
+                    zinfo.compress_type = zipfile.ZIP_DEFLATED
+
+                sha256 = hashlib.sha256()
+                with open(path, "rb") as src, zipf.open(zinfo, "w") as dest:
+                    while chunk := src.read(CHUNK_SIZE):
+                        sha256.update(chunk)
+                        dest.write(chunk)
+                        if data := stream.drain():
+                            yield data
+
+                manifest["files"][arcname] = {"size": zinfo.file_size, "sha256": sha256.hexdigest()}
+                if data := stream.drain():
+                    yield data
+
+            zipf.writestr(
+                "manifest.json",
+                json.dumps(manifest, indent=2, ensure_ascii=False),
+                compress_type=zipfile.ZIP_DEFLATED,
+            )
+        yield stream.drain()
+    finally:
+        os.remove(tmp_db)
@@ -0,0 +1,81 @@
+from datetime import date
+from threading import Lock
+
+
+class PageCache:
+    """
+    Кэш готовых HTML-страниц публичного резюме.
+    Сбрасывается при любом изменении моделей резюме (см. database.py)
+    и в полночь, т.к. общий стаж зависит от текущей даты.
+    """
+
+    def __init__(self):
+        self._pages = {}
+        # Сжатые варианты страниц: {(key, encoding): bytes}
+        self._encoded = {}
+        self._day = date.today()
+        # Растёт при каждом сбросе: страница, собранная по данным до сброса,
+        # не попадает в кэш после него
+        self._generation = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _clear(self):
+        self._pages.clear()
+        self._encoded.clear()
+        self._generation += 1
+
+    @property
+    def generation(self) -> int:
+        """
+        Читается до загрузки данных страницы и передаётся в set().
+        """
+        with self._lock:
+            return self._generation
+
+    def get(self, key):
+        with self._lock:
+            if self._day != date.today():
+                self._clear()
+                self._day = date.today()
+            page = self._pages.get(key)
+            if page is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return page
+
+    def set(self, key, page, generation: int):
+        # Между чтением данных и записью был сброс: страница уже устарела
+        with self._lock:
+            if generation == self._generation:
+                self._pages[key] = page
+
+    def get_encoded(self, key, encoding):
+        with self._lock:
+            return self._encoded.get((key, encoding))
+
+    def set_encoded(self, key, page, encoding, data):
+        # Сохраняем, только если страница не сменилась и не была сброшена,
+        # пока её сжимали
+        with self._lock:
+            if self._pages.get(key) is page:
+                self._encoded[(key, encoding)] = data
+
+    def purge(self):
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._pages),
+                "ratio": round(self.hits / total * 100, 1) if total else 0.0,
+            }
+
+
+page_cache = PageCache()
@@ -0,0 +1,175 @@
+import os
+import zlib
+
+import brotli
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+from .http_cache import encoded_etag, negotiate_encoding
+
+COMPRESS_MIN_SIZE = int(os.getenv("CVAAS_COMPRESS_MIN_SIZE", "500"))
+BROTLI_QUALITY = int(os.getenv("CVAAS_COMPRESS_BROTLI_QUALITY", "5"))
+GZIP_LEVEL = int(os.getenv("CVAAS_COMPRESS_GZIP_LEVEL", "6"))
+
+ENCODINGS = ("br", "gzip")
+# Сжимаем только текст: zip, pdf и изображения уже сжаты
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.split(";")[0].strip().lower().startswith(COMPRESSIBLE_TYPES)
+
+
+def add_vary(headers: MutableHeaders):
+    # Кэши не должны отдавать сжатый вариант клиенту без его поддержки и наоборот
+    if is_compressible(headers.get("content-type", "")) and "accept-encoding" not in headers.get("vary", "").lower():
+        headers.add_vary_header("Accept-Encoding")
+
+
+def compress(data: bytes, encoding: str, brotli_quality: int = BROTLI_QUALITY, gzip_level: int = GZIP_LEVEL) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=brotli_quality)
+    return zlib.compress(data, gzip_level, wbits=31)
+
+
+class StreamCompressor:
+    """
+    Сжатие потока по частям: после каждой части буфер сбрасывается,
+    чтобы клиент получал данные по мере генерации, а не в конце.
+    """
+
+    def __init__(self, encoding: str, brotli_quality: int, gzip_level: int):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def process(self, data: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+class CompressionMiddleware:
+    """
+    Brotli/gzip для динамических ответов (HTML, JSON, NDJSON), включая
+    StreamingResponse. Ответы, у которых уже есть Content-Encoding
+    (предсжатые ассеты, страницы из кэша), пропускаются как есть.
+    Vary: Accept-Encoding получает любой текстовый ответ, даже несжатый.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_SIZE,
+                 brotli_quality: int = BROTLI_QUALITY, gzip_level: int = GZIP_LEVEL):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.brotli_quality = brotli_quality
+        self.gzip_level = gzip_level
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), ENCODINGS)
+        responder = CompressionResponder(send, encoding, self.minimum_size, self.brotli_quality, self.gzip_level)
+        await self.app(scope, receive, responder.send)
+
+
+class CompressionResponder:
+    def __init__(self, send, encoding, minimum_size, brotli_quality, gzip_level):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.brotli_quality = brotli_quality
+        self.gzip_level = gzip_level
+        self.start_message = None
+        self.compressor = None
+        self.passthrough = False
+
+    def should_compress(self, headers) -> bool:
+        # Только 200: у 206 Content-Range указывает смещения в несжатом теле
+        return (
+            self.start_message["status"] == 200
+            and "content-range" not in headers
+            and "content-encoding" not in headers
+            and "no-transform" not in headers.get("cache-control", "")
+            and is_compressible(headers.get("content-type", ""))
+        )
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            add_vary(headers)
+            if (self.encoding is None or not self.should_compress(headers)
+                    or (not more_body and len(body) < self.minimum_size)):
+                self.passthrough = True
+                await self._send(self.start_message)
+                await self._send(message)
+                return
+
+            headers["Content-Encoding"] = self.encoding
+            if "etag" in headers:
+                headers["ETag"] = encoded_etag(headers["etag"], self.encoding)
+            if not more_body:
+                data = compress(body, self.encoding, self.brotli_quality, self.gzip_level)
+                headers["Content-Length"] = str(len(data))
+                await self._send(self.start_message)
+                await self._send({"type": "http.response.body", "body": data})
+                return
+
+            del headers["Content-Length"]
+            self.compressor = StreamCompressor(self.encoding, self.brotli_quality, self.gzip_level)
+            await self._send(self.start_message)
+
+        data = self.compressor.process(body)
+        if not more_body:
+            data += self.compressor.finish()
+        await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+
+async def cached_page_response(request, page_cache, key, page, response_class=Response) -> Response:
+    """
+    Ответ из кэша страниц: сжатый вариант считается один раз на версию
+    страницы (с максимальным уровнем, в пуле потоков) и дальше отдаётся
+    готовыми байтами.
+    """
+    body, headers = page
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""), ENCODINGS)
+    if encoding is None or len(body) < COMPRESS_MIN_SIZE:
+        response = response_class(body, headers=headers)
+        add_vary(response.headers)
+        return response
+
+    data = page_cache.get_encoded(key, encoding)
+    if data is None:
+        data = await run_in_threadpool(compress, body, encoding, brotli_quality=11, gzip_level=9)
+        page_cache.set_encoded(key, page, encoding, data)
+    response = response_class(data, headers={
+        **headers, "ETag": encoded_etag(headers["ETag"], encoding), "Content-Encoding": encoding,
+    })
+    add_vary(response.headers)
+    return response
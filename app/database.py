@@ -1,34 +1,241 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool
 from .models import Base, Admin
+from .metrics import instrument_engine
+from .profiler import sql_profiler
 from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+from pathlib import Path
+import logging
 import os
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./resume.db"
+logger = logging.getLogger(__name__)
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+SQLALCHEMY_DATABASE_URL = os.getenv("CVAAS_DATABASE_URL", "sqlite:///./resume.db")
+
+# Профиль SQLite: WAL позволяет публичным страницам читать,
+# пока админка пишет, без блокировки на rollback-журнале
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("CVAAS_DB_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("CVAAS_DB_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("CVAAS_DB_BUSY_TIMEOUT", "5000")),
+    "mmap_size": int(os.getenv("CVAAS_DB_MMAP_SIZE", str(64 * 1024 * 1024))),
+    "cache_size": int(os.getenv("CVAAS_DB_CACHE_SIZE", "-16000")),
+    "temp_store": "MEMORY",
+}
+DB_POOL_SIZE = int(os.getenv("CVAAS_DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("CVAAS_DB_MAX_OVERFLOW", "10"))
+DB_READ_POOL_SIZE = int(os.getenv("CVAAS_DB_READ_POOL_SIZE", "10"))
+# Ревизия схемы, которую создавал create_all до перехода на Alembic при старте
+UNVERSIONED_REVISION = "903548454509"
+
+
+def is_sqlite_file(url: str) -> bool:
+    return url.startswith("sqlite") and ":memory:" not in url and not url.endswith("://")
+
+def apply_sqlite_profile(engine, read_only: bool = False):
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+
+def create_sqlite_engine(url: str, pool_size: int, read_only: bool = False):
+    if not is_sqlite_file(url):
+        return create_engine(url, connect_args={"check_same_thread": False} if url.startswith("sqlite") else {})
+
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=DB_MAX_OVERFLOW,
+    )
+    apply_sqlite_profile(engine, read_only)
+    return engine
+
+
+engine = create_sqlite_engine(SQLALCHEMY_DATABASE_URL, DB_POOL_SIZE)
+read_engine = (
+    create_sqlite_engine(SQLALCHEMY_DATABASE_URL, DB_READ_POOL_SIZE, read_only=True)
+    if is_sqlite_file(SQLALCHEMY_DATABASE_URL) else engine
+)
+for instrumented in {engine, read_engine}:
+    instrument_engine(instrumented)
+    sql_profiler.instrument(instrumented)
 SessionLocal = sessionmaker(bind=engine)
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# CVAAS_DB_ASYNC=1 переключает чтение публичных страниц и дашборда
+# на асинхронный движок (aiosqlite) вместо пула потоков Starlette
+DB_ASYNC = os.getenv("CVAAS_DB_ASYNC", "0") == "1"
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_read_engine = create_async_engine(
+        SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1),
+        pool_size=DB_READ_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+    )
+    apply_sqlite_profile(async_read_engine.sync_engine, read_only=True)
+    instrument_engine(async_read_engine.sync_engine)
+    sql_profiler.instrument(async_read_engine.sync_engine)
+    AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False)
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def run_read(fn, *args):
+    """
+    Выполняет fn(db, *args) с read-only сессией: в async-режиме через
+    AsyncSession.run_sync на aiosqlite, иначе в пуле потоков.
+    """
+    if DB_ASYNC:
+        async with AsyncReadSessionLocal() as db:
+            return await db.run_sync(fn, *args)
+
+    def call():
+        with ReadSessionLocal() as db:
+            return fn(db, *args)
+
+    return await run_in_threadpool(call)
+
+def alembic_config():
+    from alembic.config import Config
+
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    config.set_main_option("sqlalchemy.url", SQLALCHEMY_DATABASE_URL.replace("%", "%%"))
+    # Не перенастраивать логирование приложения из alembic.ini
+    config.attributes["configure_logger"] = False
+    return config
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    """
+    Проверка схемы по ревизии Alembic: при старте читается одна строка
+    alembic_version, а не сверяются все таблицы. Пустая база создаётся
+    по моделям и помечается head, непомеченная старая помечается
+    UNVERSIONED_REVISION, отставшая — мигрируется до head.
+    """
+    from alembic import command
+    from alembic.script import ScriptDirectory
+
+    config = alembic_config()
+    head = ScriptDirectory.from_config(config).get_current_head()
+    with engine.connect() as conn:
+        db_inspector = inspect(conn)
+        current = None
+        if db_inspector.has_table("alembic_version"):
+            current = conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+        has_tables = db_inspector.has_table(Admin.__tablename__)
+
+    if current == head:
+        return
+    if current is None and not has_tables:
+        Base.metadata.create_all(bind=engine)
+        command.stamp(config, "head")
+        return
+    if current is None:
+        # База создана старой версией через create_all и не помечена:
+        # её схема соответствует ревизии 004, дальше догоняем миграциями
+        logger.warning("В базе нет ревизии Alembic, помечаем её как %s", UNVERSIONED_REVISION)
+        command.stamp(config, UNVERSIONED_REVISION)
+        current = UNVERSIONED_REVISION
+    logger.info("Миграция базы с ревизии %s до %s", current, head)
+    command.upgrade(config, "head")
+    # Сохранённый снимок резюме собран по старой схеме
+    with SessionLocal() as db:
+        rebuild_snapshot(db)
+        db.commit()
 
 def init_admin_user(db: Session):
     try:
         if db.query(Admin).first() is None:
             username = os.getenv("CVAAS_ADMIN_USER", "admin")
             raw_password = os.getenv("CVAAS_ADMIN_PASSWORD")
+            if not raw_password:
+                logger.warning("CVAAS_ADMIN_PASSWORD не задан, администратор не создан")
+                return
             password_hash = pwd_context.hash(raw_password)
             db.add(Admin(username=username, password_hash=password_hash))
             db.commit()
     finally:
         db.close()
 
-from sqlalchemy import event
+from sqlalchemy.orm import object_session
 from .mixins import TimestampMixin
+from .cache import page_cache
+from .snapshot import rebuild_snapshot
+from .info_store import info_store
 from datetime import datetime
 
+# Обработчики, которые нужно вызвать после изменения резюме
+# (например, фоновый рендер PDF, см. main.py)
+resume_change_callbacks = []
+
+def resume_changed():
+    page_cache.purge()
+    info_store.invalidate()
+    for callback in resume_change_callbacks:
+        callback()
+
+def mark_resume_changed(target):
+    db = object_session(target)
+    if db is not None:
+        db.info["resume_changed"] = True
+
 @event.listens_for(TimestampMixin, 'before_update', propagate=True)
 def receive_before_update(mapper, connection, target):
     target.updated_at = datetime.utcnow()
+    mark_resume_changed(target)
+
+@event.listens_for(TimestampMixin, 'after_insert', propagate=True)
+def receive_after_insert(mapper, connection, target):
+    mark_resume_changed(target)
+
+@event.listens_for(TimestampMixin, 'after_delete', propagate=True)
+def receive_after_delete(mapper, connection, target):
+    mark_resume_changed(target)
+
+@event.listens_for(SessionLocal, 'do_orm_execute')
+def receive_do_orm_execute(orm_execute_state):
+    # db.query(Model).delete() и массовые update не вызывают mapper-события
+    if orm_execute_state.is_delete or orm_execute_state.is_update:
+        orm_execute_state.session.info["resume_changed"] = True
+
+@event.listens_for(SessionLocal, 'before_commit')
+def receive_before_commit(db):
+    # Снимок резюме пересобирается в той же транзакции, что и изменения
+    db.flush()
+    if db.info.get("resume_changed"):
+        rebuild_snapshot(db)
+
+@event.listens_for(SessionLocal, 'after_commit')
+def receive_after_commit(db):
+    # Сбрасываем кэш только после коммита, иначе параллельный запрос
+    # успеет закэшировать ещё не закоммиченные (старые) данные
+    if db.info.pop("resume_changed", False):
+        resume_changed()
+
+@event.listens_for(SessionLocal, 'after_rollback')
+def receive_after_rollback(db):
+    db.info.pop("resume_changed", None)
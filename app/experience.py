@@ -0,0 +1,117 @@
+import re
+from datetime import date
+
+# "03.2021", "3.2021", "03/2021" в period и "2021-03" в start_date/end_date
+PERIOD_MONTH_RE = re.compile(r"(\d{1,2})\s*[./]\s*(\d{4})")
+ISO_MONTH_RE = re.compile(r"(\d{4})-(\d{1,2})")
+PERIOD_SEPARATOR_RE = re.compile(r"\s*[—–]\s*|\s+-\s+")
+PRESENT_MARKERS = ("н.в", "наст", "сейчас", "present", "now")
+
+
+def month_ordinal(year: int, month: int) -> int:
+    """
+    Номер месяца от начала эры: разность двух номеров — число месяцев между ними.
+    """
+    return year * 12 + month - 1
+
+
+def parse_month(value) -> int | None:
+    if not value:
+        return None
+    match = ISO_MONTH_RE.search(value)
+    if match:
+        year, month = int(match.group(1)), int(match.group(2))
+    else:
+        match = PERIOD_MONTH_RE.search(value)
+        if not match:
+            return None
+        month, year = int(match.group(1)), int(match.group(2))
+    if not 1 <= month <= 12:
+        return None
+    return month_ordinal(year, month)
+
+
+def is_present(value) -> bool:
+    value = (value or "").lower()
+    return any(marker in value for marker in PRESENT_MARKERS)
+
+
+def experience_months(period, start_date=None, end_date=None) -> tuple[int | None, int | None]:
+    """
+    (start_month, end_month) записи опыта; end_month=None — "по н.в.".
+    Сначала берутся start_date/end_date, затем текст period. Если начало
+    не разобрать — (None, None), такая запись в стаж не входит.
+    """
+    start_text, end_text = (PERIOD_SEPARATOR_RE.split(period or "", maxsplit=1) + [""])[:2]
+    start = parse_month(start_date) or parse_month(start_text)
+    if start is None:
+        return None, None
+    end = parse_month(end_date) or parse_month(end_text)
+    if end is None and not is_present(end_text):
+        # Период без окончания (только "MM.YYYY") стаж не увеличивает
+        end = start
+    return start, end
+
+
+def merge_intervals(intervals) -> list[tuple[int, int]]:
+    """
+    Объединяет пересекающиеся и смежные полуинтервалы [start, end).
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def total_experience_months(spans, today: date | None = None) -> int:
+    """
+    Стаж в месяцах по парам (start_month, end_month); end_month=None — "по н.в.".
+    """
+    today = today or date.today()
+    current = month_ordinal(today.year, today.month)
+    intervals = []
+    for start, end in spans:
+        if start is None:
+            continue
+        end = current if end is None else end
+        if end > start:
+            intervals.append((start, end))
+    # Параллельная работа в нескольких местах не удваивает стаж
+    return sum(end - start for start, end in merge_intervals(intervals))
+
+
+def format_experience(total_months: int) -> str:
+    years = total_months // 12
+    months = total_months % 12
+
+    year_word = pluralize_ru(years, ["год", "года", "лет"])
+    month_word = pluralize_ru(months, ["месяц", "месяца", "месяцев"])
+
+    if years and months:
+        return f"{years} {year_word} {months} {month_word}"
+    elif years:
+        return f"{years} {year_word}"
+    elif months:
+        return f"{months} {month_word}"
+    else:
+        return "меньше месяца"
+
+
+def calculate_total_experience(experiences, today: date | None = None) -> str:
+    return format_experience(total_experience_months(((e.start_month, e.end_month) for e in experiences), today))
+
+
+def pluralize_ru(number, forms):
+    """
+    Склонение по числу: ["год", "года", "лет"] и ["месяц", "месяца", "месяцев"]
+    """
+    number = abs(number)
+    if number % 10 == 1 and number % 100 != 11:
+        return forms[0]
+    elif 2 <= number % 10 <= 4 and not (12 <= number % 100 <= 14):
+        return forms[1]
+    else:
+        return forms[2]
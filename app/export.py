@@ -0,0 +1,83 @@
+import json
+from datetime import datetime
+from textwrap import indent as indent_lines
+
+from sqlalchemy import select
+
+from .database import ReadSessionLocal
+from .snapshot import SNAPSHOT_SECTIONS
+
+YIELD_PER = 500
+CHUNK_SIZE = 64 * 1024
+
+EXPORT_FORMATS = {
+    "pretty": ("application/json", "json"),
+    "compact": ("application/json", "json"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+
+def iter_rows(db, model):
+    result = db.execute(select(model.__table__).execution_options(yield_per=YIELD_PER))
+    for row in result.mappings():
+        yield {
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in row.items()
+        }
+
+
+def iter_json(db, pretty: bool = True):
+    """
+    Тот же документ, что json.dump(data, indent=4) для pretty,
+    но собирается построчно, не держа всё резюме в памяти.
+    """
+    nl, pad = ("\n", " " * 4) if pretty else ("", "")
+    dumps_kwargs = {"indent": 4} if pretty else {"separators": (",", ":")}
+    colon = ": " if pretty else ":"
+
+    yield "{"
+    for i, (section, model) in enumerate(SNAPSHOT_SECTIONS.items()):
+        yield ("," if i else "") + nl + pad + json.dumps(section) + colon + "["
+        first = True
+        for record in iter_rows(db, model):
+            chunk = json.dumps(record, ensure_ascii=False, **dumps_kwargs)
+            if pretty:
+                chunk = indent_lines(chunk, pad * 2)
+            yield ("" if first else ",") + nl + chunk
+            first = False
+        yield ("" if first else nl + pad) + "]"
+    yield nl + "}"
+
+
+def iter_ndjson(db):
+    for section, model in SNAPSHOT_SECTIONS.items():
+        for record in iter_rows(db, model):
+            yield json.dumps({"section": section, "data": record}, ensure_ascii=False) + "\n"
+
+
+def iter_export(fmt: str = "pretty"):
+    """
+    Потоковый экспорт резюме по таблицам. Сессия живёт внутри генератора,
+    т.к. StreamingResponse читает его уже после выхода из обработчика;
+    все таблицы читаются в одной транзакции, т.е. из одного состояния базы.
+    Генератор синхронный и всегда читает через пул потоков, в том числе
+    при CVAAS_DB_ASYNC=1.
+    """
+    db = ReadSessionLocal()
+    try:
+        if db.get_bind().dialect.name == "sqlite":
+            # pysqlite не открывает транзакцию перед SELECT: без явного BEGIN
+            # каждая таблица читалась бы из своего снимка WAL
+            db.connection().exec_driver_sql("BEGIN")
+        chunks = iter_ndjson(db) if fmt == "ndjson" else iter_json(db, pretty=fmt == "pretty")
+        buffer, size = [], 0
+        for chunk in chunks:
+            buffer.append(chunk)
+            size += len(chunk)
+            if size >= CHUNK_SIZE:
+                yield "".join(buffer).encode()
+                buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer).encode()
+    finally:
+        db.close()
@@ -0,0 +1,166 @@
+import os
+import stat
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from hashlib import sha256
+
+from fastapi.responses import Response
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+CONTENT_CODINGS = ("br", "gzip")
+
+
+def make_etag(*parts) -> str:
+    digest = sha256("|".join(str(p) for p in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """
+    ETag сжатого варианта: у br, gzip и несжатого тела разные байты,
+    поэтому сильный ETag у них тоже должен различаться.
+    """
+    if not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def strip_encoding(etag: str) -> str:
+    for encoding in CONTENT_CODINGS:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag.removesuffix(suffix) + '"'
+    return etag
+
+
+def http_date(dt: datetime) -> str:
+    # В базе updated_at хранится как наивное UTC-время (datetime.utcnow)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return format_datetime(dt.astimezone(timezone.utc), usegmt=True)
+
+
+def cache_headers(etag: str, last_modified: datetime | None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def is_not_modified(request_headers, response_headers) -> bool:
+    """
+    Проверка условного GET по RFC 9110: If-None-Match важнее If-Modified-Since.
+    ETag любого сжатого варианта совпадает с ETag несжатого ответа.
+    """
+    if_none_match = request_headers.get("if-none-match")
+    etag = response_headers.get("etag") or response_headers.get("ETag")
+    if if_none_match is not None:
+        tags = [strip_encoding(t.strip().removeprefix("W/")) for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request_headers.get("if-modified-since")
+    last_modified = response_headers.get("last-modified") or response_headers.get("Last-Modified")
+    if not if_modified_since or not last_modified:
+        return False
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+def negotiate_encoding(accept_encoding: str, available) -> str | None:
+    """
+    Выбор кодировки по Accept-Encoding с учётом q-значений.
+    available — кодировки в порядке предпочтения сервера (br, затем gzip).
+    """
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
+
+
+class ConditionalFiles(StaticFiles):
+    """
+    StaticFiles с условным GET из этого модуля: CompressionMiddleware
+    добавляет к ETag суффикс кодировки (см. encoded_etag).
+    """
+
+    def is_not_modified(self, response_headers, request_headers) -> bool:
+        return is_not_modified(request_headers, response_headers)
+
+
+class UploadFiles(ConditionalFiles):
+    """
+    Раздача static/uploads: файлы перезаписываются на месте (photo.jpg),
+    поэтому браузер обязан перепроверять их по ETag/Last-Modified.
+    Файлы в immutable_dirs названы по хэшу содержимого и кэшируются навсегда.
+    """
+
+    def __init__(self, *args, immutable_dirs=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.immutable_dirs = tuple(immutable_dirs)
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        relative = os.path.relpath(full_path, self.directory)
+        if relative.split(os.sep, 1)[0] in self.immutable_dirs:
+            response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+        else:
+            response.headers.setdefault("cache-control", "no-cache")
+        return response
+
+
+class AssetFiles(ConditionalFiles):
+    """
+    Раздача собранных ассетов (static/dist): в имени файла хэш содержимого,
+    поэтому кэш бессрочный. Если рядом лежит .br/.gz и клиент его принимает,
+    отдаётся заранее сжатый вариант.
+    """
+
+    encodings = (("br", ".br"), ("gzip", ".gz"))
+
+    async def get_response(self, path: str, scope):
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        available = []
+        for encoding, suffix in self.encodings:
+            full_path, stat_result = self.lookup_path(path + suffix)
+            if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+                available.append((encoding, full_path, stat_result))
+
+        chosen = negotiate_encoding(accept_encoding, [encoding for encoding, _, _ in available])
+        if chosen is None:
+            response = await super().get_response(path, scope)
+        else:
+            _, full_path, stat_result = next(v for v in available if v[0] == chosen)
+            # mimetypes понимает суффиксы .br/.gz: тип style.css.br — text/css
+            response = self.file_response(full_path, stat_result, scope)
+            if response.status_code == 200:
+                response.headers["content-encoding"] = chosen
+
+        if response.status_code in (200, 304):
+            response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+            if available:
+                response.headers["vary"] = "Accept-Encoding"
+        return response
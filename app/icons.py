@@ -0,0 +1,168 @@
+"""
+Сборка собственного набора иконок вместо Font Awesome с CDN.
+
+Шаблоны сканируются на классы вида "fas fa-phone" / "fab fa-github",
+из шрифтов Font Awesome Free оставляются только найденные глифы
+(fontTools, WOFF2), рядом пишется минимальный static/icons.css.
+Здесь же собирается локальный favicon.
+
+Результат лежит в static/ и коммитится, поэтому исходники Font Awesome
+нужны только для пересборки после добавления иконки в шаблон:
+
+    pip install fontawesomefree
+    python -m app.icons            # или --source путь/к/fontawesome-free
+"""
+import argparse
+import importlib.util
+import io
+import json
+import logging
+import os
+import re
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = Path("templates")
+STATIC_DIR = Path("static")
+FONTS_DIR = STATIC_DIR / "fonts"
+ICONS_CSS = STATIC_DIR / "icons.css"
+
+ICON_CLASS_RE = re.compile(r"\b(fas|fab|far|fa-solid|fa-brands|fa-regular)\s+fa-([a-z0-9-]+)")
+STYLE_PREFIXES = {
+    "fas": "solid", "fa-solid": "solid",
+    "fab": "brands", "fa-brands": "brands",
+    "far": "regular", "fa-regular": "regular",
+}
+# (файл шрифта Font Awesome, font-weight, CSS-классы стиля)
+FONT_STYLES = {
+    "solid": ("fa-solid-900.ttf", 900, ".fas,.fa-solid"),
+    "brands": ("fa-brands-400.ttf", 400, ".fab,.fa-brands"),
+    "regular": ("fa-regular-400.ttf", 400, ".far,.fa-regular"),
+}
+
+FAVICON_ICON = ("solid", "file-lines")
+FAVICON_COLOR = "#2563eb"
+FAVICON_SIZES = (16, 32, 48)
+
+
+def find_source() -> Path:
+    if os.getenv("CVAAS_FONTAWESOME_DIR"):
+        return Path(os.environ["CVAAS_FONTAWESOME_DIR"])
+    spec = importlib.util.find_spec("fontawesomefree")
+    if spec is None or not spec.submodule_search_locations:
+        raise SystemExit("Нужен Font Awesome Free: pip install fontawesomefree или --source")
+    return Path(next(iter(spec.submodule_search_locations))) / "static" / "fontawesomefree"
+
+
+def scan_templates(templates_dir: Path = TEMPLATES_DIR) -> dict:
+    used = {}
+    for template in sorted(templates_dir.rglob("*.html")):
+        for prefix, name in ICON_CLASS_RE.findall(template.read_text(encoding="utf-8")):
+            used.setdefault(STYLE_PREFIXES[prefix], set()).add(name)
+    return used
+
+
+def resolve_codepoint(metadata: dict, style: str, name: str) -> int:
+    """
+    Код глифа по имени иконки; старые имена из FA 4/5 (cog, sign-out-alt)
+    ищутся среди алиасов.
+    """
+    icon = metadata.get(name)
+    if icon is None:
+        icon = next((i for i in metadata.values() if name in i.get("aliases", {}).get("names", [])), None)
+    if icon is None or style not in icon.get("free", []):
+        raise SystemExit(f"Иконки fa-{name} нет в Font Awesome Free ({style})")
+    return int(icon["unicode"], 16)
+
+
+def subset_font(source: Path, codepoints, out_path: Path):
+    from fontTools import subset
+
+    options = subset.Options()
+    options.flavor = "woff2"
+    options.layout_features = []
+    options.hinting = False
+    options.desubroutinize = True
+    options.name_IDs = [0, 1, 2]
+    font = subset.load_font(str(source), options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=sorted(codepoints))
+    subsetter.subset(font)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    subset.save_font(font, str(out_path), options)
+
+
+def render_css(icons: dict) -> str:
+    lines = [
+        "/* Сгенерировано python -m app.icons из Font Awesome Free (CC BY 4.0 / SIL OFL 1.1) */",
+    ]
+    for style in icons:
+        _, weight, _ = FONT_STYLES[style]
+        lines.append(
+            f'@font-face{{font-family:"CVaaS Icons {style}";font-style:normal;font-weight:{weight};'
+            f'font-display:block;src:url(fonts/icons-{style}.woff2) format("woff2")}}'
+        )
+    lines.append(
+        ".fa,.fas,.fab,.far,.fa-solid,.fa-brands,.fa-regular{display:inline-block;font-style:normal;"
+        "font-variant:normal;line-height:1;text-rendering:auto;-webkit-font-smoothing:antialiased;"
+        "-moz-osx-font-smoothing:grayscale}"
+    )
+    for style in icons:
+        _, weight, selectors = FONT_STYLES[style]
+        lines.append(f'{selectors}{{font-family:"CVaaS Icons {style}";font-weight:{weight}}}')
+    for style, codepoints in icons.items():
+        for name, codepoint in sorted(codepoints.items()):
+            lines.append(f'.fa-{name}::before{{content:"\\{codepoint:x}"}}')
+    return "\n".join(lines) + "\n"
+
+
+def build_favicon(source: Path, metadata: dict):
+    """
+    favicon.svg из SVG иконки и favicon.ico, отрисованный тем же глифом.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    style, name = FAVICON_ICON
+    svg = (source / "svgs" / style / f"{name}.svg").read_text(encoding="utf-8")
+    svg = re.sub(r"<!--.*?-->", "", svg).replace("<path ", f'<path fill="{FAVICON_COLOR}" ', 1)
+    (STATIC_DIR / "favicon.svg").write_text(svg, encoding="utf-8")
+
+    size = FAVICON_SIZES[-1] * 4
+    font = ImageFont.truetype(str(source / "webfonts" / FONT_STYLES[style][0]), size - size // 8)
+    glyph = chr(resolve_codepoint(metadata, style, name))
+    image = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    left, top, right, bottom = draw.textbbox((0, 0), glyph, font=font)
+    draw.text(((size - right - left) / 2, (size - bottom - top) / 2), glyph, font=font, fill=FAVICON_COLOR)
+    buffer = io.BytesIO()
+    image.save(buffer, "ICO", sizes=[(s, s) for s in FAVICON_SIZES])
+    (STATIC_DIR / "favicon.ico").write_bytes(buffer.getvalue())
+
+
+def build_icons(source: Path) -> dict:
+    metadata = json.loads((source / "metadata" / "icons.json").read_text(encoding="utf-8"))
+    used = scan_templates()
+
+    icons = {}
+    for style in FONT_STYLES:
+        if style not in used:
+            (FONTS_DIR / f"icons-{style}.woff2").unlink(missing_ok=True)
+            continue
+        icons[style] = {name: resolve_codepoint(metadata, style, name) for name in used[style]}
+        subset_font(source / "webfonts" / FONT_STYLES[style][0], icons[style].values(), FONTS_DIR / f"icons-{style}.woff2")
+
+    ICONS_CSS.write_text(render_css(icons), encoding="utf-8")
+    build_favicon(source, metadata)
+    return icons
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("fontTools").setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description="Сборка подмножества иконок Font Awesome")
+    parser.add_argument("--source", type=Path, help="каталог Font Awesome Free (webfonts/, metadata/, svgs/)")
+    args = parser.parse_args()
+    built = build_icons(args.source or find_source())
+    for style, codepoints in built.items():
+        logger.info("%s: %s", style, ", ".join(sorted(codepoints)))
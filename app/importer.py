@@ -0,0 +1,229 @@
+from datetime import datetime
+
+import ijson
+from ijson.common import ObjectBuilder
+from pydantic import ValidationError
+from sqlalchemy import delete, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from .database import SessionLocal
+from .experience import experience_months
+from .schemas import IMPORT_SCHEMAS, PERIOD_FIELDS
+from .snapshot import SNAPSHOT_SECTIONS
+from .uploads import referenced_files, release_files
+
+BATCH_SIZE = 500
+MAX_ERRORS = 20
+
+# Естественные ключи для режима слияния: по ним запись из файла
+# сопоставляется с уже существующей строкой
+NATURAL_KEYS = {
+    "info": ("field",),
+    "experience": ("company", "role", "start_date"),
+    "skills": ("name",),
+    "courses": ("title", "organization", "year"),
+    "educations": ("degree", "institution", "start_date"),
+    "languages": ("name",),
+    "projects": ("title",),
+    "certificates": ("title", "issuer", "year"),
+    "recommendations": ("name", "company"),
+}
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+def iter_items(fp):
+    """
+    Инкрементально разбирает {"section": [{...}, ...], ...}: в памяти
+    одновременно находится только текущая запись, а не весь документ.
+    """
+    builder = None
+    item_prefix = None
+    indexes = {}
+
+    for prefix, event, value in ijson.parse(fp):
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == item_prefix and event == "end_map":
+                section = item_prefix[:-len(".item")]
+                yield section, indexes[section], builder.value
+                builder = None
+            continue
+
+        if prefix == "" and event == "start_map":
+            continue
+        if prefix == "" and event not in ("map_key", "end_map"):
+            raise ImportFormatError("Ожидался JSON-объект с разделами резюме")
+
+        section, _, rest = prefix.partition(".")
+        if section not in IMPORT_SCHEMAS:
+            continue
+        if rest == "" and event not in ("start_array", "end_array"):
+            raise ImportFormatError(f"Раздел {section} должен быть списком")
+        if rest != "item" or event in ("end_array", "end_map"):
+            continue
+
+        indexes[section] = indexes.get(section, -1) + 1
+        if event == "start_map":
+            builder = ObjectBuilder()
+            builder.event(event, value)
+            item_prefix = prefix
+        else:
+            # Скаляр или вложенный список вместо объекта — отклонит валидация
+            yield section, indexes[section], value
+
+
+def format_validation_error(section: str, index: int, exc: ValidationError) -> str:
+    details = "; ".join(
+        f"{'.'.join(str(p) for p in err['loc']) or 'запись'}: {err['msg']}" for err in exc.errors()
+    )
+    return f"{section}[{index}]: {details}"
+
+
+def load_existing(db, model, key_fields) -> dict:
+    """
+    {естественный ключ: [строки по возрастанию id]}. Уникальности по ключу
+    в таблицах нет, поэтому строк с одним ключом может быть несколько.
+    """
+    existing = {}
+    for row in db.execute(select(model.__table__).order_by(model.id)).mappings():
+        existing.setdefault(tuple(row[k] for k in key_fields), []).append(dict(row))
+    return existing
+
+
+def import_resume(fp, dry_run: bool = False, mode: str = "replace", delete_missing: bool = False) -> dict:
+    """
+    Импорт резюме из JSON-файла в одной транзакции.
+
+    mode="replace" — удалить всё и загрузить файл заново;
+    mode="merge" — сопоставить записи по естественному ключу (NATURAL_KEYS),
+    вставить новые, обновить только изменившиеся колонки и, если задан
+    delete_missing, удалить записи, которых нет в файле. Из нескольких
+    строк базы с одним ключом сопоставляется первая, остальные считаются
+    в diff как duplicates и с delete_missing удаляются.
+
+    Записи валидируются до вставки; при любой ошибке (или в режиме
+    dry_run) транзакция откатывается и текущее резюме не меняется.
+    """
+    merge = mode == "merge"
+    counts = {section: 0 for section in IMPORT_SCHEMAS}
+    diff = {
+        section: {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0, "duplicates": 0}
+        for section in IMPORT_SCHEMAS
+    }
+    errors = []
+    inserts = {section: [] for section in IMPORT_SCHEMAS}
+    updates = {section: [] for section in IMPORT_SCHEMAS}
+    existing = {}
+    seen = {section: set() for section in IMPORT_SCHEMAS}
+    file_urls = set()
+
+    def flush(section):
+        model = SNAPSHOT_SECTIONS[section]
+        if inserts[section]:
+            db.bulk_insert_mappings(model, inserts[section])
+            inserts[section].clear()
+        if updates[section]:
+            db.bulk_update_mappings(model, updates[section])
+            updates[section].clear()
+
+    def merge_record(section, index, record):
+        key = tuple(record.get(k) for k in NATURAL_KEYS[section])
+        if key in seen[section]:
+            errors.append(f"{section}[{index}]: повторяется ключ {', '.join(map(str, key))}")
+            return
+        seen[section].add(key)
+
+        rows = existing[section].get(key)
+        if not rows:
+            inserts[section].append(record)
+            diff[section]["inserted"] += 1
+            return
+
+        # Дубликаты остаются несопоставленными: с delete_missing они удаляются
+        current = rows.pop(0)
+        if section == "experience" and any(k in record for k in PERIOD_FIELDS):
+            # Месяцы — по итоговой записи: частичная запись может задать
+            # только start_date, а period и end_date остаются из базы
+            merged = {**current, **record}
+            record["start_month"], record["end_month"] = experience_months(
+                merged.get("period"), merged.get("start_date"), merged.get("end_date")
+            )
+        changes = {k: v for k, v in record.items() if k != "updated_at" and current.get(k) != v}
+        if not changes:
+            diff[section]["unchanged"] += 1
+            return
+        changes["id"] = current["id"]
+        # Свежая дата, а не из файла: иначе "Резюме обновлено" и
+        # Last-Modified не отразили бы это изменение
+        changes["updated_at"] = datetime.utcnow()
+        updates[section].append(changes)
+        diff[section]["updated"] += 1
+
+    db = SessionLocal()
+    try:
+        # Файлы сертификатов до импорта: замена и удаление записей
+        # не должны оставлять их в хранилище без ссылок
+        file_urls = referenced_files(db)
+        for section, model in SNAPSHOT_SECTIONS.items():
+            if merge:
+                existing[section] = load_existing(db, model, NATURAL_KEYS[section])
+                diff[section]["duplicates"] = sum(len(rows) - 1 for rows in existing[section].values())
+            else:
+                db.execute(delete(model))
+
+        for section, index, item in iter_items(fp):
+            try:
+                if not isinstance(item, dict):
+                    raise ImportFormatError(f"{section}[{index}]: ожидался объект")
+                record = IMPORT_SCHEMAS[section].model_validate(item)
+            except ValidationError as e:
+                errors.append(format_validation_error(section, index, e))
+            except ImportFormatError as e:
+                errors.append(str(e))
+            else:
+                counts[section] += 1
+                if not errors:
+                    if merge:
+                        merge_record(section, index, record.model_dump(exclude_unset=True))
+                    else:
+                        inserts[section].append(record.model_dump(exclude_unset=True))
+                    if len(inserts[section]) + len(updates[section]) >= BATCH_SIZE:
+                        flush(section)
+
+            if len(errors) >= MAX_ERRORS:
+                errors.append("Слишком много ошибок, проверка остановлена")
+                break
+
+        if not errors:
+            for section in IMPORT_SCHEMAS:
+                flush(section)
+                if merge and delete_missing:
+                    model = SNAPSHOT_SECTIONS[section]
+                    ids = [row["id"] for rows in existing[section].values() for row in rows]
+                    if ids:
+                        db.execute(delete(model).where(model.id.in_(ids)))
+                        diff[section]["deleted"] = len(ids)
+            db.flush()
+    except ijson.JSONError:
+        errors.append("Невалидный JSON-файл")
+    except ImportFormatError as e:
+        errors.append(str(e))
+    except SQLAlchemyError as e:
+        errors.append(f"Ошибка базы данных: {e.orig if hasattr(e, 'orig') else e}")
+
+    try:
+        if errors or dry_run:
+            db.rollback()
+        else:
+            if merge and any(d["inserted"] or d["updated"] for d in diff.values()):
+                # bulk_*_mappings не вызывают mapper-события, см. database.py
+                db.info["resume_changed"] = True
+            db.commit()
+            release_files(db, file_urls)
+    finally:
+        db.close()
+
+    return {"counts": counts, "diff": diff if merge else None, "errors": errors, "dry_run": dry_run}
@@ -0,0 +1,77 @@
+from datetime import datetime
+from threading import Lock
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from .models import Info
+
+
+class InfoStore:
+    """
+    Поля Info (ключ-значение) с кэшем всей таблицы в памяти процесса.
+    Кэш сбрасывается после коммита любого изменения резюме
+    (см. resume_changed в database.py), поэтому после записи следующее
+    чтение снова идёт в базу.
+    """
+
+    def __init__(self):
+        self._values = None
+        # Номер поколения защищает от гонки: чтение, начатое до записи,
+        # не положит в кэш старые значения после сброса
+        self._generation = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_all(self, db: Session) -> dict:
+        with self._lock:
+            if self._values is not None:
+                self.hits += 1
+                return dict(self._values)
+            self.misses += 1
+            generation = self._generation
+
+        values = dict(db.execute(select(Info.field, Info.value)).all())
+        with self._lock:
+            if generation == self._generation:
+                self._values = values
+        return dict(values)
+
+    def get(self, db: Session, field: str, default=None):
+        value = self.get_all(db).get(field)
+        return default if value is None else value
+
+    def save(self, db: Session, values: dict):
+        """
+        Записывает все поля одним INSERT ... ON CONFLICT(field) DO UPDATE.
+        Строки с тем же значением не трогаются и не меняют updated_at.
+        Коммит остаётся за вызывающим.
+        """
+        if not values:
+            return
+        now = datetime.utcnow()
+        stmt = insert(Info).values([
+            {"field": field, "value": value, "updated_at": now} for field, value in values.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Info.field],
+            set_={"value": stmt.excluded.value, "updated_at": stmt.excluded.updated_at},
+            where=Info.value.is_distinct_from(stmt.excluded.value),
+        )
+        if db.execute(stmt).rowcount:
+            # Core-вставка не вызывает mapper-события, см. database.py
+            db.info["resume_changed"] = True
+
+    def invalidate(self):
+        with self._lock:
+            self._values = None
+            self._generation += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._values or ())}
+
+
+info_store = InfoStore()
@@ -1,169 +1,254 @@
 from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, Response
 from starlette.responses import RedirectResponse
 from .models import Experience, Skill, Info, Course, Education, Language, Project, Certificate, Recommendation
 from .version import __version__
 from sqlalchemy.orm import Session
-from .database import SessionLocal
-from .auth import router as auth_router, require_login
+from .database import SessionLocal, ReadSessionLocal, run_read, resume_change_callbacks, init_db, init_admin_user
+from .cache import page_cache
+from .compression import CompressionMiddleware, cached_page_response
+from .stats import get_resume_stats
+from .snapshot import ensure_snapshot, get_snapshot
+from .pdf import PdfRenderer, this_month
+from .photo import MAX_PHOTO_BYTES, PHOTO_PATH, load_photo_manifest
+from .uploads import IMMUTABLE_DIRS, MAX_CERTIFICATE_BYTES, UploadLimitMiddleware
+from .assets import build_assets, manifest_digest
+from .templating import templates, precompile_templates, templates_digest
+from .http_cache import make_etag, cache_headers, is_not_modified, not_modified, ConditionalFiles, UploadFiles, AssetFiles
+from .auth import router as auth_router, require_login, is_logged_in, login_guard
+from .info_store import info_store
+from .twofa import qr_cache
+from .profiler import SqlProfilerMiddleware
+from .metrics import metrics, MetricsMiddleware, metrics_allowed, CONTENT_TYPE as METRICS_CONTENT_TYPE
 from fastapi.middleware import Middleware
 from starlette.middleware.sessions import SessionMiddleware
-from os.path import exists
-from datetime import datetime, date
-from dateutil.relativedelta import relativedelta
+from os.path import exists, getmtime
+from datetime import datetime, date, timezone
 from time import time
-from jinja2 import pass_context
+import logging
+from contextlib import asynccontextmanager
+from starlette.concurrency import run_in_threadpool
 
 
-app = FastAPI()
-app.add_middleware(SessionMiddleware, secret_key="devops_secret_key_2025_!@#%&xyz")
-
-app.mount("/static", StaticFiles(directory="static"), name="static")
-
-templates = Jinja2Templates(directory="templates")
-
-@pass_context
-def nl2br(ctx, value):
-    return value.replace('\n', '<br>')
+logger = logging.getLogger(__name__)
 
-templates.env.filters['nl2br'] = nl2br
+def startup():
+    """
+    Инициализация вынесена из импорта модуля: проверка схемы, создание
+    администратора и подготовка ассетов выполняются один раз при старте.
+    """
+    init_db()
+    init_admin_user(SessionLocal())
+    with SessionLocal() as db:
+        ensure_snapshot(db)
+    build_assets()
+    precompile_templates()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(startup)
+    pdf_renderer.schedule_prerender()
+    yield
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(SessionMiddleware, secret_key="devops_secret_key_2025_!@#%&xyz")
+app.add_middleware(UploadLimitMiddleware, limits={
+    "/admin/certificates/add": MAX_CERTIFICATE_BYTES,
+    "/admin/upload-photo": MAX_PHOTO_BYTES,
+})
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(SqlProfilerMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+app.mount("/static/uploads", UploadFiles(directory="static/uploads", check_dir=False, immutable_dirs=IMMUTABLE_DIRS), name="uploads")
+app.mount("/static/dist", AssetFiles(directory="static/dist", check_dir=False), name="assets")
+app.mount("/static", ConditionalFiles(directory="static"), name="static")
 
 @app.get("/", response_class=HTMLResponse)
-def read_root(request: Request):
-    db: Session = SessionLocal()
-    infos = {i.field: i.value for i in db.query(Info).all()}
+async def read_root(request: Request):
+    cached = page_cache.get(request.url.path)
+    if cached is not None:
+        headers = cached[1]
+        if is_not_modified(request.headers, headers):
+            return not_modified(headers)
+        return await cached_page_response(request, page_cache, request.url.path, cached, HTMLResponse)
+
+    generation = page_cache.generation
+    snapshot = await run_read(get_snapshot)
+
+    headers = cache_headers(*resume_validators(snapshot))
+    if is_not_modified(request.headers, headers):
+        return not_modified(headers)
+
+    response = render_root(request, snapshot)
+    response.headers.update(headers)
+    page_cache.set(request.url.path, (response.body, headers), generation)
+    return response
+
+def render_root(request: Request, snapshot: dict):
+    infos = snapshot["info_map"]
     visibility = infos.get("visibility", "public")
     if visibility != "public":
         return templates.TemplateResponse("resume_hidden.html", {
             "request": request,
             "message": infos.get("hidden_message", "❌ Резюме временно скрыто владельцем.")
         })
-    experiences = db.query(Experience).order_by(Experience.start_date.desc()).all()
-    skills = db.query(Skill).all()
-    courses = db.query(Course).all()
-    educations = db.query(Education).all()
-    photo_exists = exists("static/uploads/photo.jpg")
-    languages = db.query(Language).all()
-    projects = db.query(Project).all()
-    certificates = db.query(Certificate).all()
-    recommendations = db.query(Recommendation).all()
-    last_updated = get_latest_updated(db)
-    template_name = infos.get("template", "classic")
-    total_experience = calculate_total_experience(experiences)
-    db.close()
 
     return templates.TemplateResponse("resume.html", {
         "request": request,
-        "experience": experiences,
-        "total_experience": total_experience,
-        "courses": courses,
-        "skills": skills,
+        "experience": snapshot["experience"],
+        "total_experience": snapshot["total_experience"],
+        "courses": snapshot["courses"],
+        "skills": snapshot["skills"],
         "info": infos,
-        "educations": educations,
-        "photo": photo_exists,
-        "languages": languages,
-        "projects": projects,
-        "certificates": certificates, 
-        "recommendations": recommendations,
-        "last_updated": last_updated,
-        "template": template_name,
+        "educations": snapshot["educations"],
+        "photo": exists(PHOTO_PATH),
+        "photo_variants": load_photo_manifest(),
+        "languages": snapshot["languages"],
+        "projects": snapshot["projects"],
+        "certificates": snapshot["certificates"],
+        "recommendations": snapshot["recommendations"],
+        "last_updated": snapshot["last_updated"],
+        "template": infos.get("template", "classic"),
         "version": __version__,
     })
 
-def calculate_total_experience(experiences):
-    total_months = 0
-    now = datetime.today()
-
-    for exp in experiences:
-        if "—" not in exp.period:
-            continue
-        start_str, end_str = exp.period.split("—")
-        start = datetime.strptime(start_str.strip(), "%m.%Y")
-
-        end_str = end_str.strip()
-        end = now if end_str == "н.в." else datetime.strptime(end_str, "%m.%Y")
-
-        delta = relativedelta(end, start)
-        total_months += delta.years * 12 + delta.months
-
-    years = total_months // 12
-    months = total_months % 12
-
-    year_word = pluralize_ru(years, ["год", "года", "лет"])
-    month_word = pluralize_ru(months, ["месяц", "месяца", "месяцев"])
-
-    if years and months:
-        return f"{years} {year_word} {months} {month_word}"
-    elif years:
-        return f"{years} {year_word}"
-    elif months:
-        return f"{months} {month_word}"
-    else:
-        return "меньше месяца"
+def get_latest_updated(db: Session) -> datetime | None:
+    return get_resume_stats(db)[1]
 
-def pluralize_ru(number, forms):
+def resume_validators(snapshot: dict, *salt):
     """
-    Склонение по числу: ["год", "года", "лет"] и ["месяц", "месяца", "месяцев"]
+    ETag и Last-Modified резюме без рендеринга шаблона.
+    ETag строится по хэшу содержимого снимка, общему стажу (он считается при
+    чтении), манифесту ассетов и шаблонов (деплой без смены версии тоже меняет
+    HTML), Last-Modified — по времени его сборки, т.к. импорт может вернуть
+    записи со старыми updated_at.
     """
-    number = abs(number)
-    if number % 10 == 1 and number % 100 != 11:
-        return forms[0]
-    elif 2 <= number % 10 <= 4 and not (12 <= number % 100 <= 14):
-        return forms[1]
-    else:
-        return forms[2]
-
-def get_latest_updated(db: Session) -> datetime | None:
-    timestamps = []
-
-    models = [Experience, Skill, Info, Course, Education, Language, Project, Certificate, Recommendation]
-    for model in models:
-        latest = db.query(model).order_by(model.updated_at.desc().nullslast()).first()
-        if latest and latest.updated_at:
-            timestamps.append(latest.updated_at)
-
-    return max(timestamps) if timestamps else None
+    photo_mtime = datetime.fromtimestamp(getmtime(PHOTO_PATH), timezone.utc).replace(tzinfo=None) if exists(PHOTO_PATH) else None
+    etag = make_etag(snapshot["digest"], snapshot["total_experience"], photo_mtime, __version__,
+                     manifest_digest(), templates_digest(), *salt)
+    last_modified = max(d for d in (snapshot["built_at"], photo_mtime) if d)
+    return etag, last_modified
 
 @app.get("/preview", response_class=HTMLResponse)
-def preview_resume(request: Request):
-    db: Session = SessionLocal()
-    experiences = db.query(Experience).all()
-    skills = db.query(Skill).all()
-    infos = {i.field: i.value for i in db.query(Info).all()}
-    courses = db.query(Course).all()
-    educations = db.query(Education).all()
-    photo_exists = exists("static/uploads/photo.jpg")
-    languages = db.query(Language).all()
-    projects = db.query(Project).all()
-    certificates = db.query(Certificate).all()
-    recommendations = db.query(Recommendation).all()
-    last_skill = db.query(Skill).order_by(Skill.updated_at.desc()).first()
-    last_updated = get_latest_updated(db)
-    db.close()
+async def preview_resume(request: Request):
+    snapshot = await run_read(get_snapshot)
 
-    return templates.TemplateResponse("resume.html", {
+    headers = cache_headers(*resume_validators(snapshot, "preview"))
+    if is_not_modified(request.headers, headers):
+        return not_modified(headers)
+
+    response = templates.TemplateResponse("resume.html", {
         "request": request,
-        "experience": experiences,
-        "courses": courses,
-        "skills": skills,
-        "info": infos,
-        "educations": educations,
-        "photo": photo_exists,
-        "languages": languages,
-        "projects": projects,
-        "certificates": certificates,
-        "recommendations": recommendations,
-        "last_updated": last_updated,
+        "experience": snapshot["experience"],
+        "total_experience": snapshot["total_experience"],
+        "courses": snapshot["courses"],
+        "skills": snapshot["skills"],
+        "info": snapshot["info_map"],
+        "educations": snapshot["educations"],
+        "photo": exists(PHOTO_PATH),
+        "photo_variants": load_photo_manifest(),
+        "languages": snapshot["languages"],
+        "projects": snapshot["projects"],
+        "certificates": snapshot["certificates"],
+        "recommendations": snapshot["recommendations"],
+        "last_updated": snapshot["last_updated"],
         "preview": True
     })
+    response.headers.update(headers)
+    return response
+
+def render_pdf_html(snapshot: dict) -> str | None:
+    if snapshot["info_map"].get("visibility", "public") != "public":
+        return None
+    return templates.get_template("resume.html").render({
+        "experience": snapshot["experience"],
+        "total_experience": snapshot["total_experience"],
+        "courses": snapshot["courses"],
+        "skills": snapshot["skills"],
+        "info": snapshot["info_map"],
+        "educations": snapshot["educations"],
+        "photo": exists(PHOTO_PATH),
+        "languages": snapshot["languages"],
+        "projects": snapshot["projects"],
+        "certificates": snapshot["certificates"],
+        "recommendations": snapshot["recommendations"],
+        "last_updated": snapshot["last_updated"],
+        "version": __version__,
+        "preview": True,
+    })
 
+def render_current_pdf_html() -> str | None:
+    with ReadSessionLocal() as db:
+        return render_pdf_html(get_snapshot(db))
+
+pdf_renderer = PdfRenderer(render_current_pdf_html)
+resume_change_callbacks.append(pdf_renderer.schedule_prerender)
+
+@app.get("/resume.pdf")
+async def resume_pdf(request: Request):
+    current = pdf_renderer.current
+    if current is None or not current[1].exists():
+        generation, month = pdf_renderer.generation, this_month()
+        html = render_pdf_html(await run_read(get_snapshot))
+        if html is None:
+            return HTMLResponse("Резюме скрыто", status_code=404)
+        try:
+            current = await pdf_renderer.get(html, generation, month)
+        except Exception:
+            logger.exception("Не удалось отрендерить PDF резюме")
+            return HTMLResponse("PDF временно недоступен", status_code=503)
+
+    key, path = current
+    headers = cache_headers(f'"{key[:32]}"', datetime.fromtimestamp(path.stat().st_mtime, timezone.utc))
+    if is_not_modified(request.headers, headers):
+        return not_modified(headers)
+    return FileResponse(path, media_type="application/pdf", headers=headers,
+                        filename="resume.pdf", content_disposition_type="inline")
+
+def collect_runtime_metrics() -> list:
+    """
+    Значения, которые читаются в момент сбора: пулы потоков, кэши, входы.
+    """
+    from anyio.to_thread import current_default_thread_limiter
+
+    limiter = current_default_thread_limiter()
+    caches = {"page": page_cache.stats(), "info": info_store.stats(), "qr": qr_cache.stats()}
+    logins = login_guard.stats()
+    return [
+        ("cvaas_threadpool_busy", "gauge", "Занятые потоки (bcrypt: в работе и в очереди)", [
+            ({"pool": "anyio"}, limiter.borrowed_tokens),
+            ({"pool": "bcrypt"}, logins.pop("verify_pending")),
+        ]),
+        ("cvaas_threadpool_size", "gauge", "Размер пула потоков", [
+            ({"pool": "anyio"}, int(limiter.total_tokens)),
+            ({"pool": "bcrypt"}, login_guard.verifier.workers),
+        ]),
+        ("cvaas_cache_hits_total", "counter", "Попадания в кэш",
+         [({"cache": name}, stats["hits"]) for name, stats in caches.items()]),
+        ("cvaas_cache_misses_total", "counter", "Промахи кэша",
+         [({"cache": name}, stats["misses"]) for name, stats in caches.items()]),
+        ("cvaas_cache_hit_ratio", "gauge", "Доля попаданий в кэш с запуска", [
+            ({"cache": name}, round(stats["hits"] / (stats["hits"] + stats["misses"]), 4) if stats["hits"] + stats["misses"] else 0.0)
+            for name, stats in caches.items()
+        ]),
+        ("cvaas_cache_entries", "gauge", "Записей в кэше",
+         [({"cache": name}, stats["entries"]) for name, stats in caches.items()]),
+        ("cvaas_login_tracked", "gauge", "Отслеживаемые вёдра ограничения входа", [
+            ({"bucket": "ip"}, logins.pop("tracked_ips")),
+            ({"bucket": "user"}, logins.pop("tracked_users")),
+        ]),
+        ("cvaas_login_events_total", "counter", "Попытки входа по результату",
+         [({"event": event}, count) for event, count in logins.items()]),
+    ]
+
+@app.get("/metrics")
+async def metrics_endpoint(request: Request):
+    if not metrics_allowed(request, is_logged_in(request)):
+        return Response("Unauthorized", status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    return Response(metrics.render(collect_runtime_metrics()), media_type=METRICS_CONTENT_TYPE)
 
-from .database import init_db, init_admin_user
 from .admin import router as admin_router
 
-init_db()
-init_admin_user(SessionLocal())
 app.include_router(admin_router)
 app.include_router(auth_router)
@@ -0,0 +1,222 @@
+import os
+import secrets
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+METRICS_TOKEN = os.getenv("CVAAS_METRICS_TOKEN", "")
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# ASGI scope текущего запроса: по нему SQL-запросы привязываются к маршруту.
+# Контекст копируется в пул потоков, так что синхронные обработчики и
+# run_read тоже видят свой запрос
+current_scope = ContextVar("current_scope", default=None)
+
+
+def route_label(scope) -> str:
+    """
+    Шаблон пути, а не сам путь: /admin/edit/{id}, а не /admin/edit/42,
+    иначе число рядов метрик растёт с каждым новым URL.
+    """
+    if scope is None:
+        return "background"
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if "endpoint" in scope and scope.get("root_path"):
+        # Mount (StaticFiles): путь монтирования
+        return scope["root_path"]
+    return "unmatched"
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{escape_label(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def format_value(value) -> str:
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self, name, label_names, label_values):
+        cumulative = 0
+        for le, count in zip((*self.buckets, "+Inf"), self.counts):
+            cumulative += count
+            labels = format_labels((*label_names, "le"), (*label_values, le))
+            yield f"{name}_bucket{labels} {cumulative}"
+        labels = format_labels(label_names, label_values)
+        yield f"{name}_sum{labels} {format_value(self.sum)}"
+        yield f"{name}_count{labels} {cumulative}"
+
+
+class Metrics:
+    """
+    Метрики процесса в текстовом формате Prometheus, без внешних зависимостей.
+    Счётчики и гистограммы хранятся по кортежу значений меток; значения,
+    которые проще прочитать в момент сбора (кэши, пулы), передаются
+    в render() готовыми сэмплами.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._families = {}
+        self.in_flight = 0
+
+    def _family(self, name, kind, help_text, label_names):
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = {"kind": kind, "help": help_text, "labels": label_names, "series": {}}
+        return family
+
+    def inc(self, name, help_text, label_names=(), label_values=(), amount=1):
+        with self._lock:
+            series = self._family(name, "counter", help_text, label_names)["series"]
+            series[label_values] = series.get(label_values, 0) + amount
+
+    def observe(self, name, help_text, buckets, label_names=(), label_values=(), value=0.0):
+        with self._lock:
+            family = self._family(name, "histogram", help_text, label_names)
+            histogram = family["series"].get(label_values)
+            if histogram is None:
+                histogram = family["series"][label_values] = Histogram(buckets)
+            histogram.observe(value)
+
+    def track_in_flight(self, delta: int):
+        with self._lock:
+            self.in_flight += delta
+
+    def observe_request(self, method, route, status, seconds):
+        self.inc("cvaas_http_requests_total", "HTTP-запросы по маршруту и статусу",
+                 ("method", "route", "status"), (method, route, str(status)))
+        self.observe("cvaas_http_request_duration_seconds", "Время обработки HTTP-запроса", HTTP_BUCKETS,
+                     ("method", "route"), (method, route), seconds)
+
+    def observe_statement(self, route, seconds):
+        self.inc("cvaas_db_statements_total", "SQL-запросы по маршруту", ("route",), (route,))
+        self.observe("cvaas_db_statement_duration_seconds", "Время выполнения SQL-запроса", FAST_BUCKETS,
+                     ("route",), (route,), seconds)
+
+    def observe_template(self, template, seconds):
+        self.observe("cvaas_template_render_seconds", "Время рендера шаблона Jinja", FAST_BUCKETS,
+                     ("template",), (template,), seconds)
+
+    def render(self, collected=()) -> str:
+        """
+        collected — значения, снятые в момент сбора:
+        [(имя, тип, справка, [(метки dict, значение), ...]), ...].
+        """
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP cvaas_http_requests_in_progress Запросы в обработке",
+                "# TYPE cvaas_http_requests_in_progress gauge",
+                f"cvaas_http_requests_in_progress {self.in_flight}",
+            ]
+            for name, family in sorted(self._families.items()):
+                lines.append(f"# HELP {name} {family['help']}")
+                lines.append(f"# TYPE {name} {family['kind']}")
+                for label_values, value in sorted(family["series"].items()):
+                    if family["kind"] == "histogram":
+                        lines += value.samples(name, family["labels"], label_values)
+                    else:
+                        lines.append(f"{name}{format_labels(family['labels'], label_values)} {format_value(value)}")
+
+        for name, kind, help_text, samples in collected:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{format_labels(tuple(labels), tuple(labels.values()))} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class MetricsMiddleware:
+    """
+    Число, длительность и статус HTTP-запросов по маршрутам, запросы
+    в обработке. Подключается последним, чтобы учитывать и сжатие.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = current_scope.set(scope)
+        metrics.track_in_flight(1)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.track_in_flight(-1)
+            current_scope.reset(token)
+            metrics.observe_request(scope["method"], route_label(scope), status, perf_counter() - started)
+
+
+def instrument_engine(engine):
+    """
+    Считает SQL-запросы движка SQLAlchemy с привязкой к маршруту.
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_started"].pop()
+        metrics.observe_statement(route_label(current_scope.get()), perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # after_cursor_execute при ошибке не вызывается: снимаем засечку здесь
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("metrics_started"):
+            conn.info["metrics_started"].pop()
+
+
+def metrics_allowed(request, logged_in: bool) -> bool:
+    """
+    /metrics доступен администратору в сессии и скрейперу
+    с заголовком Authorization: Bearer <CVAAS_METRICS_TOKEN>.
+    """
+    if logged_in:
+        return True
+    if not METRICS_TOKEN:
+        return False
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    return scheme.lower() == "bearer" and secrets.compare_digest(token.encode(), METRICS_TOKEN.encode())
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, func, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, func, Boolean, event
 from sqlalchemy.ext.declarative import declarative_base
 from .mixins import TimestampMixin
+from .experience import experience_months
 from datetime import datetime
 
 Base = declarative_base()
@@ -14,6 +15,15 @@ class Experience(Base, TimestampMixin):
     description = Column(Text)
     start_date = Column(String)  # "YYYY-MM"
     end_date = Column(String, nullable=True)
+    # Номера месяцев (год * 12 + месяц - 1), end_month=NULL — "по н.в."
+    start_month = Column(Integer, nullable=True)
+    end_month = Column(Integer, nullable=True)
+
+@event.listens_for(Experience, 'before_insert')
+@event.listens_for(Experience, 'before_update')
+def receive_experience_before_save(mapper, connection, target):
+    # Стаж считается по номерам месяцев, а не разбором period на каждый запрос
+    target.start_month, target.end_month = experience_months(target.period, target.start_date, target.end_date)
 
 class Skill(Base, TimestampMixin):
     __tablename__ = "skills"
@@ -82,3 +92,8 @@ class Admin(Base):
     security_question = Column(String, default="Место рождения?")
     security_answer = Column(String)
 
+class ResumeSnapshot(Base):
+    __tablename__ = "resume_snapshot"
+    id = Column(Integer, primary_key=True)
+    data = Column(Text)
+    built_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
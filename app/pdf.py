@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+PDF_CACHE_DIR = Path(os.getenv("CVAAS_PDF_CACHE_DIR", "cache/pdf"))
+PDF_WORKERS = int(os.getenv("CVAAS_PDF_WORKERS", "1"))
+PDF_CACHE_KEEP = 10
+
+# Фиктивный адрес, относительно которого WeasyPrint разрешает /static/...
+BASE_URL = "http://cvaas.local/"
+
+
+def fetch_local(url: str):
+    """
+    url_fetcher для WeasyPrint: отдаём только свои файлы из static/,
+    внешние ресурсы (CDN) не запрашиваем — рендер не зависит от сети.
+    """
+    from weasyprint import default_url_fetcher
+
+    if not url.startswith(BASE_URL + "static/"):
+        raise ValueError(f"Внешний ресурс не загружается: {url}")
+    path = Path(url[len(BASE_URL):].split("?")[0]).resolve()
+    if not path.is_relative_to(Path("static").resolve()):
+        raise ValueError(f"Недопустимый путь: {url}")
+    return default_url_fetcher(path.as_uri())
+
+
+def this_month() -> str:
+    return date.today().strftime("%Y-%m")
+
+
+def render_pdf_file(html: str, out_path: str) -> str:
+    """
+    Выполняется в отдельном процессе: рендер тяжёлый по CPU.
+    Файл пишется атомарно, чтобы не отдать недописанный PDF.
+    """
+    from weasyprint import HTML
+
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    HTML(string=html, base_url=BASE_URL, url_fetcher=fetch_local).write_pdf(tmp_path)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def pdf_cache_key(html: str, template_name: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(template_name.encode())
+    digest.update(html.encode())
+    for asset in (Path("static/style.css"), Path("static/uploads/photo.jpg")):
+        if asset.exists():
+            digest.update(asset.read_bytes())
+    return digest.hexdigest()
+
+
+class PdfRenderer:
+    """
+    PDF-версия резюме с дисковым кэшем по хэшу HTML + CSS + шаблона.
+    После каждого изменения резюме PDF заранее рендерится в фоне,
+    так что посетитель получает уже готовый файл.
+    """
+
+    def __init__(self, render_html, template_name: str = "resume.html"):
+        # render_html() -> str | None: HTML для PDF или None, если резюме скрыто
+        self._render_html = render_html
+        self._template_name = template_name
+        self._pool = None
+        self._inflight = {}
+        self._lock = Lock()
+        self._warm_lock = Lock()
+        self._warm_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-warmup")
+        # (key, path, месяц) актуального PDF; поколение защищает от того, чтобы
+        # рендер устаревшей версии перезаписал current после нового изменения
+        self._current = None
+        self.generation = 0
+
+    @property
+    def current(self):
+        """
+        (key, path) готового PDF или None. В PDF есть общий стаж, а с "по н.в."
+        он растёт каждый месяц без правок в админке, поэтому PDF,
+        отрендеренный в прошлом месяце, актуальным не считается.
+        """
+        with self._lock:
+            if self._current is None or self._current[2] != this_month():
+                return None
+            return self._current[:2]
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def submit(self, html: str):
+        """
+        Возвращает (key, path, future). Одинаковые HTML рендерятся один раз,
+        даже если их одновременно запросили фоновый прогрев и посетитель.
+        """
+        key = pdf_cache_key(html, self._template_name)
+        path = PDF_CACHE_DIR / f"{key}.pdf"
+        with self._lock:
+            if path.exists():
+                return key, path, None
+            future = self._inflight.get(key)
+            if future is None:
+                PDF_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                future = self._get_pool().submit(render_pdf_file, html, str(path))
+                self._inflight[key] = future
+                future.add_done_callback(lambda f, key=key: self._on_rendered(key, f))
+        return key, path, future
+
+    def _on_rendered(self, key, future):
+        with self._lock:
+            self._inflight.pop(key, None)
+        if future.exception() is None:
+            self._prune()
+
+    def _prune(self):
+        files = sorted(PDF_CACHE_DIR.glob("*.pdf"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for old in files[PDF_CACHE_KEEP:]:
+            old.unlink(missing_ok=True)
+
+    async def get(self, html: str, generation: int, month: str):
+        """
+        generation и month — значения на момент, когда html был собран.
+        """
+        key, path, future = self.submit(html)
+        if future is not None:
+            await asyncio.wrap_future(future)
+        self._set_current(key, path, generation, month)
+        return key, path
+
+    def _set_current(self, key, path, generation, month):
+        with self._lock:
+            if generation == self.generation:
+                self._current = (key, path, month)
+
+    def schedule_prerender(self):
+        """
+        Вызывается после коммита изменений резюме. Серия быстрых сохранений
+        в админке схлопывается в один фоновый рендер.
+        """
+        with self._lock:
+            self.generation += 1
+            self._current = None
+        if self._warm_lock.acquire(blocking=False):
+            self._warm_executor.submit(self._prerender)
+
+    def _prerender(self):
+        self._warm_lock.release()
+        generation, month = self.generation, this_month()
+        try:
+            html = self._render_html()
+            if html is None:
+                return
+            key, path, future = self.submit(html)
+            if future is not None:
+                future.result()
+            self._set_current(key, path, generation, month)
+        except Exception:
+            logger.exception("Не удалось подготовить PDF резюме")
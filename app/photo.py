@@ -0,0 +1,86 @@
+import json
+import os
+from pathlib import Path
+
+from .uploads import UPLOAD_DIR
+
+PHOTO_PATH = UPLOAD_DIR / "photo.jpg"
+PHOTO_DIR = UPLOAD_DIR / "photo"
+PHOTO_MANIFEST = UPLOAD_DIR / "photo.json"
+
+# Фото на странице выводится 120px: 1x, 2x и 4x (последний — для PDF/печати)
+PHOTO_WIDTHS = (120, 240, 480)
+PHOTO_FORMATS = (("WEBP", "webp"), ("JPEG", "jpg"))
+MAX_PHOTO_BYTES = int(os.getenv("CVAAS_PHOTO_MAX_BYTES", str(15 * 1024 * 1024)))
+
+
+def write_atomic(path: Path, write):
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def save_image(image, path: Path, fmt: str):
+    # exif не передаём: метаданные (геопозиция, модель телефона) удаляются
+    options = {"quality": 82, "optimize": True}
+    if fmt == "JPEG":
+        options["progressive"] = True
+    else:
+        options["method"] = 6
+    write_atomic(path, lambda tmp: image.save(tmp, fmt, **options))
+
+
+def process_photo(src_path: str, digest: str) -> dict:
+    """
+    Декодирует загруженное фото и пишет варианты по ширине в JPEG и WebP
+    с именами по хэшу содержимого. Выполняется в пуле потоков.
+    """
+    from PIL import Image, ImageOps
+
+    digest = digest[:16]
+    with Image.open(src_path) as original:
+        image = ImageOps.exif_transpose(original).convert("RGB")
+
+    PHOTO_DIR.mkdir(parents=True, exist_ok=True)
+    widths = [w for w in PHOTO_WIDTHS if w < image.width] or [image.width]
+    if image.width not in widths and image.width < PHOTO_WIDTHS[-1]:
+        widths.append(image.width)
+
+    for width in widths:
+        variant = image
+        if width < image.width:
+            variant = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        for fmt, ext in PHOTO_FORMATS:
+            save_image(variant, PHOTO_DIR / f"{digest}-{width}.{ext}", fmt)
+        if width == widths[-1]:
+            # photo.jpg остаётся для админки, PDF и старых ссылок
+            save_image(variant, PHOTO_PATH, "JPEG")
+
+    manifest = {"hash": digest, "widths": widths}
+    write_atomic(PHOTO_MANIFEST, lambda tmp: tmp.write_text(json.dumps(manifest)))
+    return manifest
+
+
+def prune_photo_variants():
+    """
+    Удаляет варианты прежних фото. Вызывается после сброса кэша страниц:
+    до него закэшированный HTML ещё ссылается на старые файлы.
+    """
+    manifest = load_photo_manifest()
+    if manifest is None:
+        return
+    # Оставляем то, что в манифесте: он мог смениться параллельной загрузкой
+    for old in PHOTO_DIR.iterdir():
+        if not old.name.startswith(f"{manifest['hash']}-"):
+            old.unlink(missing_ok=True)
+
+
+def load_photo_manifest() -> dict | None:
+    try:
+        return json.loads(PHOTO_MANIFEST.read_text())
+    except (OSError, ValueError):
+        return None
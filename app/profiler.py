@@ -0,0 +1,256 @@
+import logging
+import os
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from threading import Lock
+from time import perf_counter
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# CVAAS_SQL_PROFILE=1 — запись всех SQL-запросов каждого HTTP-запроса
+# с местом вызова и поиском N+1; для разработки, не для прода
+SQL_PROFILE = os.getenv("CVAAS_SQL_PROFILE", "0") == "1"
+SLOW_QUERY_MS = float(os.getenv("CVAAS_SLOW_QUERY_MS", "100"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("CVAAS_N_PLUS_ONE_THRESHOLD", "3"))
+
+APP_DIR = str(Path(__file__).resolve().parent)
+PROJECT_DIR = str(Path(__file__).resolve().parent.parent)
+
+# Бюджеты запросов к базе по эндпоинтам: "METHOD путь" -> максимум при уже
+# собранном снимке резюме. Проверяются через check_query_budgets
+QUERY_BUDGETS = {
+    "GET /": 1,
+    "GET /preview": 1,
+    "GET /admin/dashboard": 1,
+    "GET /admin/info": 1,
+    # Первый показ создаёт секрет 2FA
+    "GET /admin/settings": 3,
+    # BEGIN и по запросу на раздел
+    "GET /admin/export-json": 10,
+    # Upsert и пересборка снимка резюме в той же транзакции
+    "POST /admin/info": 13,
+}
+
+current_profile = ContextVar("current_profile", default=None)
+
+
+class QueryRecord(NamedTuple):
+    statement: str
+    # Только типы параметров: значения (хэши паролей, секреты 2FA) не пишем
+    params: str
+    duration: float
+    call_site: str
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def params_shape(parameters, executemany: bool = False) -> str:
+    if executemany:
+        if not parameters:
+            return "[]"
+        return f"{len(parameters)}×{params_shape(parameters[0])}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items()) + "}"
+    return "(" + ", ".join(type(p).__name__ for p in parameters or ()) + ")"
+
+
+def find_call_site() -> str:
+    """
+    Ближайший кадр стека из кода приложения (не SQLAlchemy и не сам профайлер).
+    """
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_DIR) and filename != __file__:
+            return f"{os.path.relpath(filename, PROJECT_DIR)}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+class QueryProfile:
+    """
+    SQL-запросы одного HTTP-запроса.
+    """
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.queries = []
+        self._lock = Lock()
+
+    def add(self, record: QueryRecord):
+        # Синхронные обработчики и run_read пишут сюда из пула потоков
+        with self._lock:
+            self.queries.append(record)
+
+    def __len__(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self) -> float:
+        return sum(q.duration for q in self.queries)
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list[tuple[str, int, list[str]]]:
+        """
+        Кандидаты в N+1: один и тот же SQL threshold и более раз за запрос.
+        [(SQL, сколько раз, места вызова), ...]
+        """
+        counts = Counter(q.statement for q in self.queries)
+        return [
+            (statement, count, sorted({q.call_site for q in self.queries if q.statement == statement}))
+            for statement, count in counts.most_common()
+            if count >= threshold
+        ]
+
+    def report(self) -> str:
+        lines = [f"{self.label}: {len(self)} SQL, {self.total_time * 1000:.1f} мс"]
+        for q in self.queries:
+            lines.append(f"  {q.duration * 1000:7.2f} мс  {q.call_site}  {q.params}  {' '.join(q.statement.split())[:200]}")
+        return "\n".join(lines)
+
+
+class SqlProfiler:
+    """
+    Профайлер SQL по HTTP-запросам. Медленные запросы (дольше
+    CVAAS_SLOW_QUERY_MS) логируются всегда. Запись всех запросов
+    включается CVAAS_SQL_PROFILE=1 или на время assert_max_queries.
+    """
+
+    def __init__(self, enabled: bool = SQL_PROFILE, slow_query_ms: float = SLOW_QUERY_MS):
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self._listeners = []
+
+    @property
+    def active(self) -> bool:
+        return self.enabled or bool(self._listeners)
+
+    def instrument(self, engine):
+        from sqlalchemy import event
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("profiler_started", []).append(perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            duration = perf_counter() - conn.info["profiler_started"].pop()
+            profile = current_profile.get()
+            slow = self.slow_query_ms and duration * 1000 >= self.slow_query_ms
+            if profile is None and not slow:
+                return
+            record = QueryRecord(statement, params_shape(parameters, executemany), duration, find_call_site())
+            if profile is not None:
+                profile.add(record)
+            if slow:
+                logger.warning("Медленный SQL (%.1f мс) %s %s: %s", duration * 1000, record.call_site,
+                               record.params, " ".join(statement.split())[:500])
+
+        @event.listens_for(engine, "handle_error")
+        def handle_error(exception_context):
+            conn = exception_context.connection
+            if conn is not None and conn.info.get("profiler_started"):
+                conn.info["profiler_started"].pop()
+
+    def finish(self, profile: QueryProfile):
+        for listener in list(self._listeners):
+            listener(profile)
+        if not self.enabled:
+            return
+        logger.info(profile.report())
+        for statement, count, call_sites in profile.repeated():
+            logger.warning("Возможен N+1 в %s: %d одинаковых запросов из %s: %s", profile.label, count,
+                           ", ".join(call_sites), " ".join(statement.split())[:200])
+
+    @contextmanager
+    def capture(self):
+        """
+        Собирает профили всех HTTP-запросов внутри блока (в т.ч. из TestClient).
+        """
+        profiles = []
+        self._listeners.append(profiles.append)
+        try:
+            yield profiles
+        finally:
+            self._listeners.remove(profiles.append)
+
+    @contextmanager
+    def assert_max_queries(self, limit: int):
+        """
+        Для тестов: каждый HTTP-запрос внутри блока должен уложиться
+        в limit SQL-запросов, иначе QueryBudgetExceeded с полным списком.
+
+            with sql_profiler.assert_max_queries(2):
+                client.get("/")
+        """
+        with self.capture() as profiles:
+            yield profiles
+        over = [p for p in profiles if len(p) > limit]
+        if over:
+            raise QueryBudgetExceeded(
+                f"Бюджет {limit} SQL превышен:\n" + "\n".join(p.report() for p in over)
+            )
+
+
+sql_profiler = SqlProfiler()
+
+
+def check_query_budgets(client, budgets: dict = QUERY_BUDGETS, requests: dict | None = None):
+    """
+    Прогоняет эндпоинты из budgets через client (TestClient с выполненным
+    входом) и проверяет бюджеты. Аргументы запросов (например, data для
+    POST) — в requests по тому же ключу "METHOD путь".
+    """
+    requests = requests or {}
+    for endpoint, limit in budgets.items():
+        method, path = endpoint.split(" ", 1)
+        with sql_profiler.assert_max_queries(limit):
+            client.request(method, path, follow_redirects=False, **requests.get(endpoint, {}))
+
+
+class SqlProfilerMiddleware:
+    """
+    Заводит QueryProfile на каждый HTTP-запрос, пока профайлер активен.
+    X-SQL-Queries/X-SQL-Time-Ms уходят вместе с заголовками ответа, поэтому
+    у потоковых ответов (экспорт) их нет: запросы при генерации тела
+    ещё не выполнены. Полный профиль таких ответов — в логе.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not sql_profiler.active:
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile(f"{scope['method']} {scope['path']}")
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start" and sql_profiler.enabled:
+                # Поток или нет, станет ясно по первой части тела
+                start_message = message
+                return
+            if start_message is not None:
+                if message["type"] == "http.response.body" and not message.get("more_body", False):
+                    start_message["headers"] = list(start_message.get("headers", [])) + [
+                        (b"x-sql-queries", str(len(profile)).encode()),
+                        (b"x-sql-time-ms", f"{profile.total_time * 1000:.1f}".encode()),
+                    ]
+                await send(start_message)
+                start_message = None
+            await send(message)
+
+        token = current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_profile.reset(token)
+            sql_profiler.finish(profile)
@@ -0,0 +1,103 @@
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict, model_validator
+
+from .experience import experience_months
+
+
+class ImportSchema(BaseModel):
+    # id не импортируем: записи получают новые ключи в этой базе
+    model_config = ConfigDict(extra="ignore", coerce_numbers_to_str=True)
+
+    updated_at: datetime | None = None
+
+
+class InfoIn(ImportSchema):
+    field: str
+    value: str | None = None
+
+
+class SkillIn(ImportSchema):
+    name: str
+
+
+PERIOD_FIELDS = ("period", "start_date", "end_date")
+
+
+class ExperienceIn(ImportSchema):
+    company: str | None = None
+    role: str | None = None
+    period: str | None = None
+    description: str | None = None
+    start_date: str | None = None
+    end_date: str | None = None
+    start_month: int | None = None
+    end_month: int | None = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def fill_months(cls, data):
+        # bulk_insert_mappings не вызывает mapper-события, поэтому номера
+        # месяцев считаются здесь, а не берутся из файла как есть. Без полей
+        # периода не считаются вовсе: частичная запись в режиме слияния
+        # не должна затирать месяцы (см. merge_record в importer.py)
+        if isinstance(data, dict):
+            data = {k: v for k, v in data.items() if k not in ("start_month", "end_month")}
+            if any(k in data for k in PERIOD_FIELDS):
+                data["start_month"], data["end_month"] = experience_months(
+                    data.get("period"), data.get("start_date"), data.get("end_date")
+                )
+        return data
+
+
+class CourseIn(ImportSchema):
+    title: str | None = None
+    organization: str | None = None
+    year: str | None = None
+
+
+class EducationIn(ImportSchema):
+    degree: str | None = None
+    institution: str | None = None
+    start_date: str | None = None
+    end_date: str | None = None
+    specialization: str | None = None
+
+
+class LanguageIn(ImportSchema):
+    name: str
+    level: str | None = None
+
+
+class ProjectIn(ImportSchema):
+    title: str | None = None
+    description: str | None = None
+    link: str | None = None
+    stack: str | None = None
+
+
+class CertificateIn(ImportSchema):
+    title: str | None = None
+    issuer: str | None = None
+    year: int | None = None
+    file_path: str | None = None
+    link: str | None = None
+
+
+class RecommendationIn(ImportSchema):
+    name: str | None = None
+    company: str | None = None
+    quote: str | None = None
+
+
+IMPORT_SCHEMAS = {
+    "info": InfoIn,
+    "experience": ExperienceIn,
+    "skills": SkillIn,
+    "courses": CourseIn,
+    "educations": EducationIn,
+    "languages": LanguageIn,
+    "projects": ProjectIn,
+    "certificates": CertificateIn,
+    "recommendations": RecommendationIn,
+}
@@ -0,0 +1,97 @@
+import hashlib
+import json
+from datetime import date, datetime
+
+from sqlalchemy.orm import Session
+
+from .experience import format_experience, total_experience_months
+from .models import Experience, Skill, Info, Course, Education, Language, Project, Certificate, Recommendation, ResumeSnapshot
+from .stats import get_resume_stats
+
+SNAPSHOT_ID = 1
+
+# Порядок и ключи совпадают с форматом экспорта в JSON
+SNAPSHOT_SECTIONS = {
+    "info": Info,
+    "experience": Experience,
+    "skills": Skill,
+    "courses": Course,
+    "educations": Education,
+    "languages": Language,
+    "projects": Project,
+    "certificates": Certificate,
+    "recommendations": Recommendation,
+}
+
+
+def serialize(obj) -> dict:
+    result = {}
+    for col in obj.__table__.columns:
+        value = getattr(obj, col.name)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        result[col.name] = value
+    return result
+
+
+def build_snapshot(db: Session) -> dict:
+    rows = {}
+    for section, model in SNAPSHOT_SECTIONS.items():
+        query = db.query(model)
+        if model is Experience:
+            query = query.order_by(Experience.start_month.desc())
+        rows[section] = query.all()
+
+    counts, last_updated = get_resume_stats(db)
+    data = {section: [serialize(obj) for obj in objs] for section, objs in rows.items()}
+    data["counts"] = counts
+    data["last_updated"] = last_updated.isoformat() if last_updated else None
+    # Хэш содержимого — основа ETag: в отличие от updated_at он меняется
+    # и при удалениях, и при импорте записей со старыми датами
+    data["digest"] = hashlib.sha256(json.dumps(data, ensure_ascii=False, sort_keys=True).encode()).hexdigest()
+    data["built_at"] = datetime.utcnow().isoformat()
+    return data
+
+
+def rebuild_snapshot(db: Session) -> dict:
+    """
+    Пересобирает снимок резюме в текущей транзакции.
+    Вызывается перед коммитом любой сессии, изменившей резюме (см. database.py).
+    """
+    data = build_snapshot(db)
+    db.merge(ResumeSnapshot(id=SNAPSHOT_ID, data=json.dumps(data, ensure_ascii=False)))
+    return data
+
+
+def ensure_snapshot(db: Session):
+    """
+    Сохраняет снимок, если его ещё нет (вызывается при старте приложения).
+    """
+    if db.get(ResumeSnapshot, SNAPSHOT_ID) is None:
+        rebuild_snapshot(db)
+        db.commit()
+
+
+def get_snapshot(db: Session) -> dict:
+    """
+    Собранное резюме одним запросом по первичному ключу. Только читает базу:
+    вызывается из read-only сессий публичных страниц.
+    """
+    snapshot = db.get(ResumeSnapshot, SNAPSHOT_ID)
+    # Снимка нет только до старта приложения (см. ensure_snapshot)
+    data = json.loads(snapshot.data) if snapshot else build_snapshot(db)
+
+    data["info_map"] = {i["field"]: i["value"] for i in data["info"]}
+    if data["last_updated"]:
+        data["last_updated"] = datetime.fromisoformat(data["last_updated"])
+    data["built_at"] = datetime.fromisoformat(data["built_at"])
+
+    # Стаж с "по н.в." растёт каждый месяц без изменений в базе,
+    # поэтому считается при чтении, а не хранится в снимке
+    today = date.today()
+    spans = [(e["start_month"], e["end_month"]) for e in data["experience"]]
+    data["total_experience"] = format_experience(total_experience_months(spans, today))
+    if any(start is not None and end is None for start, end in spans):
+        # Страница меняется с началом месяца, даже если снимок старше
+        data["built_at"] = max(data["built_at"], datetime(today.year, today.month, 1))
+    return data
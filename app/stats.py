@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from sqlalchemy import func, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from .models import Experience, Skill, Info, Course, Education, Language, Project, Certificate, Recommendation
+
+RESUME_SECTIONS = {
+    "info": Info,
+    "skills": Skill,
+    "experience": Experience,
+    "education": Education,
+    "courses": Course,
+    "languages": Language,
+    "projects": Project,
+    "certificates": Certificate,
+    "recommendations": Recommendation,
+}
+
+
+def get_resume_stats(db: Session) -> tuple[dict[str, int], datetime | None]:
+    """
+    Количество записей по разделам и дата последнего изменения резюме
+    одним запросом (UNION ALL агрегатов по всем таблицам).
+    """
+    stmt = union_all(*[
+        select(
+            literal(section).label("section"),
+            func.count().label("total"),
+            func.max(model.updated_at).label("updated_at"),
+        ).select_from(model)
+        for section, model in RESUME_SECTIONS.items()
+    ])
+
+    counts = {}
+    timestamps = []
+    for section, total, updated_at in db.execute(stmt):
+        counts[section] = total
+        if updated_at:
+            timestamps.append(updated_at)
+
+    return counts, max(timestamps) if timestamps else None
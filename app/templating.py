@@ -0,0 +1,94 @@
+import hashlib
+import logging
+import os
+from pathlib import Path
+
+from fastapi.templating import Jinja2Templates
+from time import perf_counter
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, pass_context
+
+from .assets import asset_url
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = "templates"
+TEMPLATE_CACHE_DIR = Path(os.getenv("CVAAS_TEMPLATE_CACHE_DIR", "cache/jinja"))
+# В проде шаблоны не меняются: без auto_reload Jinja не делает stat() на каждый рендер
+TEMPLATES_AUTO_RELOAD = os.getenv("CVAAS_TEMPLATES_AUTO_RELOAD", "0") == "1"
+
+
+@pass_context
+def nl2br(ctx, value):
+    return value.replace('\n', '<br>')
+
+
+class TimedTemplate(Template):
+    """
+    Шаблон с замером времени рендера для /metrics.
+    """
+
+    def render(self, *args, **kwargs):
+        started = perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            metrics.observe_template(self.name, perf_counter() - started)
+
+
+def create_environment() -> Environment:
+    """
+    Единое окружение Jinja для main, auth и admin: шаблоны компилируются
+    один раз, байткод кэшируется на диске и переживает перезапуск.
+    """
+    loader = FileSystemLoader(TEMPLATES_DIR)
+    TEMPLATE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    env = Environment(
+        loader=loader,
+        autoescape=True,
+        auto_reload=TEMPLATES_AUTO_RELOAD,
+        bytecode_cache=FileSystemBytecodeCache(str(TEMPLATE_CACHE_DIR)),
+        # Все шаблоны помещаются в кэш и никогда из него не вытесняются
+        cache_size=max(len(loader.list_templates()) * 2, 50),
+    )
+    env.template_class = TimedTemplate
+    env.filters['nl2br'] = nl2br
+    env.globals['asset_url'] = asset_url
+    return env
+
+
+templates = Jinja2Templates(env=create_environment())
+_templates_digest = None
+
+
+def templates_digest() -> str:
+    """
+    Хэш исходников всех шаблонов (в т.ч. подключаемых через extends/include).
+    Считается один раз; с CVAAS_TEMPLATES_AUTO_RELOAD=1 — заново на каждый вызов.
+    """
+    global _templates_digest
+    if _templates_digest is None or TEMPLATES_AUTO_RELOAD:
+        digest = hashlib.sha256()
+        for name in templates.env.list_templates():
+            source, _, _ = templates.env.loader.get_source(templates.env, name)
+            digest.update(name.encode())
+            digest.update(source.encode())
+        _templates_digest = digest.hexdigest()
+    return _templates_digest
+
+
+def precompile_templates() -> int:
+    """
+    Загружает все шаблоны заранее: первый посетитель не ждёт компиляции,
+    а байткод попадает в TEMPLATE_CACHE_DIR.
+    """
+    names = templates.env.list_templates(extensions=["html"])
+    for name in names:
+        templates.env.get_template(name)
+    return len(names)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logger.info("Скомпилировано шаблонов: %d", precompile_templates())
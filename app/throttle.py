@@ -0,0 +1,156 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Semaphore
+
+LOGIN_IP_BURST = int(os.getenv("CVAAS_LOGIN_IP_BURST", "10"))
+LOGIN_IP_PER_MINUTE = float(os.getenv("CVAAS_LOGIN_IP_PER_MINUTE", "10"))
+LOGIN_USER_BURST = int(os.getenv("CVAAS_LOGIN_USER_BURST", "20"))
+LOGIN_USER_PER_MINUTE = float(os.getenv("CVAAS_LOGIN_USER_PER_MINUTE", "20"))
+LOGIN_WORKERS = int(os.getenv("CVAAS_LOGIN_WORKERS", "2"))
+LOGIN_QUEUE = int(os.getenv("CVAAS_LOGIN_QUEUE", "8"))
+MAX_BUCKETS = 10_000
+
+
+class TokenBucket:
+    """
+    Набор token bucket по ключу (IP, логин). Ведро, которое успело
+    наполниться до краёв, ничем не отличается от нового и удаляется;
+    размер ограничен MAX_BUCKETS на случай перебора с множества адресов.
+    """
+
+    def __init__(self, burst: int, per_minute: float, max_buckets: int = MAX_BUCKETS):
+        self.burst = burst
+        self.rate = per_minute / 60
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._lock = Lock()
+
+    def _tokens(self, key, now) -> float:
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def retry_after(self, key) -> int:
+        with self._lock:
+            missing = 1 - self._tokens(key, time.monotonic())
+        return max(1, int(missing / self.rate) + 1) if missing > 0 else 0
+
+    def take(self, key) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            tokens = self._tokens(key, now)
+            if tokens < 1:
+                return False
+            self._buckets[key] = (tokens - 1, now)
+            self._buckets.move_to_end(key)
+            self._evict(now)
+            return True
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def _evict(self, now):
+        # Вёдра упорядочены по последнему обращению: самые старые — в начале
+        full_after = self.burst / self.rate
+        while self._buckets:
+            key, (tokens, updated) = next(iter(self._buckets.items()))
+            if len(self._buckets) <= self.max_buckets and now - updated < full_after:
+                break
+            self._buckets.popitem(last=False)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class VerifierBusy(Exception):
+    pass
+
+
+class PasswordVerifier:
+    """
+    Проверка bcrypt в отдельном небольшом пуле с ограниченной очередью:
+    перебор паролей занимает не больше LOGIN_WORKERS ядер и не отбирает
+    потоки у публичных страниц. Сверх LOGIN_QUEUE ожидающих — отказ.
+    """
+
+    def __init__(self, pwd_context, workers: int = LOGIN_WORKERS, queue: int = LOGIN_QUEUE):
+        self._pwd_context = pwd_context
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = Semaphore(workers + queue)
+        # Проверки в работе и в очереди (меняется только из цикла событий)
+        self.pending = 0
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        if not self._slots.acquire(blocking=False):
+            raise VerifierBusy()
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._pwd_context.verify, password, password_hash)
+        finally:
+            self.pending -= 1
+            self._slots.release()
+
+
+class LoginGuard:
+    """
+    Ограничение попыток входа: ведро на IP и ведро на логин проверяются
+    до похода в базу и хэширования, поэтому отказ 429 почти бесплатный.
+    """
+
+    def __init__(self, pwd_context):
+        self.by_ip = TokenBucket(LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE)
+        self.by_user = TokenBucket(LOGIN_USER_BURST, LOGIN_USER_PER_MINUTE)
+        self.verifier = PasswordVerifier(pwd_context)
+        self._lock = Lock()
+        self.counters = {
+            "attempts": 0,
+            "success": 0,
+            "failed": 0,
+            "throttled_ip": 0,
+            "throttled_user": 0,
+            "rejected_busy": 0,
+        }
+
+    def count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def check(self, ip: str, username: str) -> int:
+        """
+        0 — попытку можно выполнять, иначе Retry-After в секундах.
+        """
+        self.count("attempts")
+        if not self.by_ip.take(ip):
+            self.count("throttled_ip")
+            return self.by_ip.retry_after(ip)
+        if not self.by_user.take(username):
+            self.count("throttled_user")
+            return self.by_user.retry_after(username)
+        return 0
+
+    async def verify(self, ip: str, username: str, password: str, password_hash: str | None) -> bool:
+        try:
+            ok = password_hash is not None and await self.verifier.verify(password, password_hash)
+        except VerifierBusy:
+            self.count("rejected_busy")
+            raise
+        if ok:
+            self.count("success")
+            self.by_ip.reset(ip)
+            self.by_user.reset(username)
+        else:
+            self.count("failed")
+        return ok
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+        stats["tracked_ips"] = len(self.by_ip)
+        stats["tracked_users"] = len(self.by_user)
+        stats["verify_pending"] = self.verifier.pending
+        return stats
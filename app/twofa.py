@@ -0,0 +1,68 @@
+import io
+from collections import OrderedDict
+from hashlib import sha256
+from threading import Lock
+
+QR_CACHE_SIZE = 8
+
+
+def provisioning_uri(admin) -> str:
+    import pyotp
+
+    return pyotp.TOTP(admin.totp_secret).provisioning_uri(name=admin.username, issuer_name="CVaaS")
+
+
+def render_qr_png(uri: str) -> bytes:
+    import qrcode
+
+    buffer = io.BytesIO()
+    qrcode.make(uri).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class QrCache:
+    """
+    PNG с QR-кодом 2FA по provisioning URI. URI меняется только вместе
+    с секретом или логином, поэтому картинка строится один раз, а не на
+    каждый показ настроек. Ключ — хэш URI, сам секрет в ключах не хранится.
+    """
+
+    def __init__(self, maxsize: int = QR_CACHE_SIZE):
+        self._images = OrderedDict()
+        self._maxsize = maxsize
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(uri: str) -> str:
+        return sha256(uri.encode()).hexdigest()[:32]
+
+    def get_png(self, uri: str) -> bytes:
+        key = self.key(uri)
+        with self._lock:
+            png = self._images.get(key)
+            if png is not None:
+                self.hits += 1
+                self._images.move_to_end(key)
+                return png
+            self.misses += 1
+
+        png = render_qr_png(uri)
+        with self._lock:
+            self._images[key] = png
+            self._images.move_to_end(key)
+            while len(self._images) > self._maxsize:
+                self._images.popitem(last=False)
+        return png
+
+    def purge(self):
+        with self._lock:
+            self._images.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._images)}
+
+
+qr_cache = QrCache()
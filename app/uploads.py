@@ -0,0 +1,294 @@
+import errno
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from collections import Counter
+from pathlib import Path
+from threading import Lock
+
+from sqlalchemy import select
+from starlette.responses import HTMLResponse
+
+from .models import Certificate
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = Path("static/uploads")
+# Файлы по хэшу содержимого: имя меняется вместе с содержимым,
+# поэтому их можно кэшировать в браузере бессрочно
+FILES_DIR = UPLOAD_DIR / "files"
+THUMBS_DIR = UPLOAD_DIR / "thumbs"
+IMMUTABLE_DIRS = ("photo", "files", "thumbs")
+# Недописанные и отклонённые загрузки: не раздаётся и не попадает в бэкап
+UPLOAD_TMP_DIR = Path(os.getenv("CVAAS_UPLOAD_TMP_DIR", "cache/uploads"))
+
+CHUNK_SIZE = 64 * 1024
+# Поля формы и заголовки multipart сверх самого файла
+FORM_OVERHEAD = 64 * 1024
+THUMB_SIZE = (240, 240)
+MAX_CERTIFICATE_BYTES = int(os.getenv("CVAAS_CERTIFICATE_MAX_BYTES", str(20 * 1024 * 1024)))
+
+# Файлы, уже лежащие в хранилище, но ещё без закоммиченного сертификата:
+# release_files их не удаляет. Под _store_lock проходят и дедупликация
+# в store_upload, и проверка ссылок с удалением в release_files
+_store_lock = Lock()
+_pending = Counter()
+
+# Тип определяется по первым байтам, а не по имени файла или Content-Type
+SIGNATURES = (
+    (b"%PDF-", "pdf"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+)
+IMAGE_TYPES = ("png", "jpg", "webp")
+CERTIFICATE_TYPES = ("pdf",) + IMAGE_TYPES
+
+
+class UploadRejected(Exception):
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class UploadLimitMiddleware:
+    """
+    Ограничивает тело POST-запроса на маршрутах загрузки ещё до разбора
+    multipart: Starlette сохраняет файл во временный целиком, прежде чем
+    обработчик прочитает первый байт. Запрос с Content-Length больше лимита
+    отклоняется без чтения тела, без Content-Length (chunked) — как только
+    прочитано больше лимита. limits: {путь: максимум байт файла}.
+    """
+
+    def __init__(self, app, limits: dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        max_bytes = self.limits.get(scope["path"]) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if max_bytes is None:
+            await self.app(scope, receive, send)
+            return
+
+        limit = max_bytes + FORM_OVERHEAD
+        rejected = HTMLResponse(f"Файл больше {max_bytes // (1024 * 1024)} МБ", status_code=413)
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > limit:
+            await rejected(scope, receive, send)
+            return
+
+        received = 0
+        too_large = False
+
+        async def limited_receive():
+            nonlocal received, too_large
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    too_large = True
+                    raise UploadRejected(rejected.body.decode(), 413)
+            return message
+
+        async def guarded_send(message):
+            # Ответ приложения на оборванный разбор формы заменяется на 413
+            if not too_large:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not too_large:
+                raise
+        if too_large:
+            await rejected(scope, receive, send)
+
+
+def sniff_type(head: bytes) -> str | None:
+    for signature, ext in SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+async def receive_upload(upload, max_bytes: int, allowed=None):
+    """
+    Пишет загрузку во временный файл по частям, попутно считая SHA-256.
+    Файл целиком в память не читается. Размер тела запроса ограничивает
+    UploadLimitMiddleware до разбора формы, здесь — точный размер и тип
+    самого файла. Возвращает (tmp_path, sha256, тип).
+    """
+    UPLOAD_TMP_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_TMP_DIR, suffix=".upload")
+    digest = hashlib.sha256()
+    size = 0
+    kind = None
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await upload.read(CHUNK_SIZE):
+                if size == 0:
+                    kind = sniff_type(chunk)
+                    if allowed is not None and kind not in allowed:
+                        raise UploadRejected(f"Недопустимый тип файла, разрешены: {', '.join(allowed)}", 415)
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejected(f"Файл больше {max_bytes // (1024 * 1024)} МБ", 413)
+                digest.update(chunk)
+                out.write(chunk)
+        if size == 0:
+            raise UploadRejected("Пустой файл")
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest(), kind
+
+
+def move_into(src: str, dest: Path):
+    """
+    os.replace из временного каталога. Если он на другой файловой системе
+    (в Docker static/uploads — отдельный том), файл копируется рядом с dest
+    и подменяется атомарно: под итоговым именем недописанный файл не виден.
+    """
+    try:
+        os.replace(src, dest)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    fd, tmp_dest = tempfile.mkstemp(dir=dest.parent, prefix=".", suffix=".tmp")
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp_dest)
+        os.replace(tmp_dest, dest)
+    except BaseException:
+        os.remove(tmp_dest)
+        raise
+    os.remove(src)
+
+
+def store_upload(tmp_path: str, digest: str, kind: str) -> str:
+    """
+    Переносит временный файл в хранилище под именем sha256.тип и
+    возвращает его URL. Одинаковые файлы хранятся в одном экземпляре.
+    До коммита сертификата файл защищён от release_files; после коммита
+    (или ошибки) вызывающий обязан вызвать finish_upload.
+    """
+    FILES_DIR.mkdir(parents=True, exist_ok=True)
+    dest = FILES_DIR / f"{digest}.{kind}"
+    file_url = "/" + dest.as_posix()
+    with _store_lock:
+        if dest.exists():
+            os.remove(tmp_path)
+        else:
+            move_into(tmp_path, dest)
+        _pending[file_url] += 1
+    return file_url
+
+
+def finish_upload(db, file_url: str):
+    """
+    Снимает защиту с файла после коммита. Если сертификат так и не
+    сохранился, файл без ссылок удаляется.
+    """
+    with _store_lock:
+        _pending[file_url] -= 1
+        if _pending[file_url] <= 0:
+            del _pending[file_url]
+    release_files(db, [file_url])
+
+
+def thumbnail_path(file_url: str) -> Path | None:
+    path = Path(file_url.lstrip("/"))
+    if path.parent != FILES_DIR:
+        return None
+    return THUMBS_DIR / f"{path.stem}.webp"
+
+
+def thumbnail_url(file_url: str | None) -> str | None:
+    thumb = thumbnail_path(file_url) if file_url else None
+    if thumb is None or not thumb.exists():
+        return None
+    return "/" + thumb.as_posix()
+
+
+def make_thumbnail(file_url: str) -> str | None:
+    """
+    Превью для админки: уменьшенное изображение или первая страница PDF
+    (через pdftoppm из poppler-utils; без него превью PDF не строится).
+    Выполняется в пуле потоков.
+    """
+    from PIL import Image
+
+    source = Path(file_url.lstrip("/"))
+    thumb = thumbnail_path(file_url)
+    if thumb is None:
+        return None
+    if thumb.exists():
+        return "/" + thumb.as_posix()
+
+    THUMBS_DIR.mkdir(parents=True, exist_ok=True)
+    UPLOAD_TMP_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=UPLOAD_TMP_DIR, prefix="thumb") as workdir:
+        if source.suffix == ".pdf":
+            pdftoppm = shutil.which("pdftoppm")
+            if pdftoppm is None:
+                return None
+            prefix = os.path.join(workdir, "page")
+            try:
+                subprocess.run(
+                    [pdftoppm, "-png", "-singlefile", "-f", "1", "-l", "1",
+                     "-scale-to", str(max(THUMB_SIZE) * 2), str(source), prefix],
+                    check=True, capture_output=True, timeout=30,
+                )
+            except (subprocess.SubprocessError, OSError):
+                logger.warning("Не удалось построить превью для %s", source)
+                return None
+            source = Path(prefix + ".png")
+
+        tmp_thumb = os.path.join(workdir, "thumb.webp")
+        try:
+            with Image.open(source) as image:
+                image.thumbnail(THUMB_SIZE)
+                image.convert("RGB").save(tmp_thumb, "WEBP", quality=80)
+        except (OSError, Image.DecompressionBombError):
+            logger.warning("Не удалось построить превью для %s", source)
+            return None
+        move_into(tmp_thumb, thumb)
+    return "/" + thumb.as_posix()
+
+
+def remove_stored(file_url: str):
+    """
+    Удаляет файл и его превью. Вызывающий код проверяет,
+    что на файл больше не ссылается ни один сертификат.
+    """
+    path = Path(file_url.lstrip("/"))
+    if not path.resolve().is_relative_to(UPLOAD_DIR.resolve()):
+        return
+    path.unlink(missing_ok=True)
+    thumb = thumbnail_path(file_url)
+    if thumb is not None:
+        thumb.unlink(missing_ok=True)
+
+
+def referenced_files(db) -> set[str]:
+    return set(db.scalars(select(Certificate.file_path).where(Certificate.file_path.is_not(None)).distinct()))
+
+
+def release_files(db, file_urls):
+    """
+    Вызывается после коммита: удаляет из file_urls файлы (и превью),
+    на которые больше не ссылается ни один сертификат. Один файл может
+    принадлежать нескольким сертификатам (хранилище по хэшу).
+    """
+    urls = {url for url in file_urls if url}
+    if not urls:
+        return
+    with _store_lock:
+        still_used = set(db.scalars(select(Certificate.file_path).where(Certificate.file_path.in_(urls))))
+        for url in urls - still_used - set(_pending):
+            remove_stored(url)
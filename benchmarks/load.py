@@ -0,0 +1,307 @@
+"""
+Нагрузочный бенчмарк публичных и админских страниц и микробенчмарки.
+
+    python benchmarks/load.py                          # размеры 10 и 500 записей на раздел
+    python benchmarks/load.py --sizes 5,100,2000 --requests 500 --concurrency 16
+    python benchmarks/load.py --compare old.json       # сравнить с прошлым прогоном
+
+Приложение app.main:app поднимается в этом же процессе на временной базе
+SQLite и опрашивается через httpx.ASGITransport: меряется само приложение,
+без сети и uvicorn. Для каждого размера резюме пересоздаётся импортом JSON.
+Результат — benchmarks/results/load.json (коммит, окружение, задержки
+p50/p95/p99 в мс, запросы в секунду), его можно сравнивать между коммитами.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_PATH = ROOT / "benchmarks" / "results" / "load.json"
+ADMIN_USER = "bench"
+ADMIN_PASSWORD = "bench-password"
+
+# (название, метод, путь, запросов, параллельность): None — значения из аргументов.
+# Импорт и бэкап пишут/читают всю базу, поэтому их меньше и по одному
+SCENARIOS = [
+    ("GET /", "GET", "/", None, None),
+    ("GET / без кэша страницы", "GET", "/", None, None),
+    ("GET /preview", "GET", "/preview", None, None),
+    ("GET /admin/dashboard", "GET", "/admin/dashboard", None, None),
+    ("GET /admin/export-json", "GET", "/admin/export-json", 20, 4),
+    ("POST /admin/import-json", "POST", "/admin/import-json", 10, 1),
+    ("GET /admin/backup", "GET", "/admin/backup", 10, 2),
+]
+WARMUP_REQUESTS = 3
+
+
+def git_revision() -> str:
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{revision}-dirty" if dirty else revision
+
+
+def make_resume(size: int) -> dict:
+    """
+    Резюме в формате экспорта JSON с size записями в каждом разделе.
+    """
+    def period(i):
+        start = 2000 + i % 20, 1 + i % 12
+        end = start[0] + 1 + i % 3, start[1]
+        return f"{start[1]:02d}.{start[0]} — {end[1]:02d}.{end[0]}", f"{start[0]}-{start[1]:02d}", f"{end[0]}-{end[1]:02d}"
+
+    info = {
+        "name": "Иван Петров", "position": "Backend-разработчик", "location": "Москва",
+        "email": "ivan@example.com", "phone": "+7 900 000-00-00", "telegram": "ivan",
+        "about": "О себе.\nНесколько строк текста.", "github": "https://github.com/ivan",
+        "job_search_status": "open", "hide_phone": "0",
+        "template": "classic", "visibility": "public", "hidden_message": "",
+    }
+    experience = []
+    for i in range(size):
+        text, start, end = period(i)
+        experience.append({
+            "company": f"Компания {i}", "role": "Разработчик", "period": text,
+            "description": "Разработка сервисов.\nПоддержка и ревью.", "start_date": start, "end_date": end,
+        })
+    return {
+        "info": [{"field": k, "value": v} for k, v in info.items()],
+        "experience": experience,
+        "skills": [{"name": f"Навык {i}"} for i in range(size)],
+        "courses": [{"title": f"Курс {i}", "organization": "Школа", "year": str(2010 + i % 15)} for i in range(size)],
+        "educations": [{"degree": "Бакалавр", "institution": f"Университет {i}", "start_date": "2005",
+                        "end_date": "2009", "specialization": "Информатика"} for i in range(size)],
+        "languages": [{"name": f"Язык {i}", "level": "B2"} for i in range(size)],
+        "projects": [{"title": f"Проект {i}", "description": "Описание проекта", "link": "https://example.com",
+                      "stack": "Python, FastAPI"} for i in range(size)],
+        "certificates": [{"title": f"Сертификат {i}", "issuer": "Вендор", "year": 2015 + i % 10} for i in range(size)],
+        "recommendations": [{"name": f"Коллега {i}", "company": "Компания", "quote": "Отличный инженер"}
+                            for i in range(size)],
+    }
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    index = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: list, wall: float, errors: int, concurrency: int) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": errors,
+        "rps": round(len(latencies) / wall, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+async def run_scenario(client, method, path, requests, concurrency, before=None, body=None) -> dict:
+    async def call():
+        if before is not None:
+            before()
+        kwargs = {}
+        if body is not None:
+            kwargs = {"files": {"json_file": ("resume.json", body, "application/json")}, "data": {"mode": "replace"}}
+        started = perf_counter()
+        response = await client.request(method, path, **kwargs)
+        return perf_counter() - started, response.status_code
+
+    for _ in range(WARMUP_REQUESTS):
+        await call()
+
+    latencies = []
+    errors = 0
+    pending = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in pending:
+            latency, status = await call()
+            latencies.append(latency)
+            errors += status >= 400
+
+    started = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, perf_counter() - started, errors, concurrency)
+
+
+def micro(fn, repeat: int = 5) -> dict:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    per_call = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "calls": number * repeat,
+        "best_us": round(min(per_call) * 1e6, 2),
+        "median_us": round(statistics.median(per_call) * 1e6, 2),
+    }
+
+
+def page_request(app, path: str = "/"):
+    """
+    Request с тем же scope, что у запроса через ASGI: шаблон страницы
+    строит ссылки через request.
+    """
+    from starlette.requests import Request
+
+    return Request({
+        "type": "http", "method": "GET", "scheme": "http", "server": ("bench", 80),
+        "path": path, "root_path": "", "query_string": b"", "headers": [(b"host", b"bench")],
+        "app": app, "router": app.router,
+    })
+
+
+def run_micro() -> dict:
+    from app.database import ReadSessionLocal
+    from app.experience import calculate_total_experience
+    from app.main import app, get_latest_updated, render_pdf_html, render_root
+    from app.models import Experience
+    from app.snapshot import get_snapshot
+
+    request = page_request(app)
+    with ReadSessionLocal() as db:
+        experiences = db.query(Experience).all()
+        snapshot = get_snapshot(db)
+        return {
+            "calculate_total_experience": micro(lambda: calculate_total_experience(experiences)),
+            "get_latest_updated": micro(lambda: get_latest_updated(db)),
+            "render_root": micro(lambda: render_root(request, snapshot)),
+            "render_pdf_html": micro(lambda: render_pdf_html(snapshot)),
+        }
+
+
+async def run_size(app, size: int, args) -> dict:
+    import httpx
+
+    from app.cache import page_cache
+    from app.importer import import_resume
+
+    resume = json.dumps(make_resume(size), ensure_ascii=False).encode()
+    report = import_resume(io.BytesIO(resume))
+    if report["errors"]:
+        raise RuntimeError(f"Не удалось загрузить резюме: {report['errors']}")
+
+    result = {"size": size, "endpoints": {}, "micro": run_micro()}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/login", data={"username": ADMIN_USER, "password": ADMIN_PASSWORD})
+        if response.status_code != 303:
+            raise RuntimeError(f"Вход не выполнен: {response.status_code}")
+
+        for name, method, path, requests, concurrency in SCENARIOS:
+            before = page_cache.purge if "без кэша" in name else None
+            body = resume if path == "/admin/import-json" else None
+            result["endpoints"][name] = await run_scenario(
+                client, method, path,
+                min(requests or args.requests, args.requests), min(concurrency or args.concurrency, args.concurrency),
+                before=before, body=body,
+            )
+            print(f"  {name}: {result['endpoints'][name]}", file=sys.stderr)
+    return result
+
+
+def configure_environment(tmp_dir: Path):
+    """
+    Переменные окружения читаются при импорте app, поэтому задаются до него.
+    """
+    os.environ.update({
+        "CVAAS_DATABASE_URL": f"sqlite:///{tmp_dir / 'resume.db'}",
+        "CVAAS_ADMIN_USER": ADMIN_USER,
+        "CVAAS_ADMIN_PASSWORD": ADMIN_PASSWORD,
+        "CVAAS_PDF_CACHE_DIR": str(tmp_dir / "pdf"),
+        "CVAAS_TEMPLATE_CACHE_DIR": str(tmp_dir / "jinja"),
+        # Под нагрузкой медленные запросы ожидаемы и засоряют вывод
+        "CVAAS_SLOW_QUERY_MS": "0",
+    })
+
+
+def benchmark(args) -> dict:
+    with tempfile.TemporaryDirectory(prefix="cvaas-bench-") as tmp:
+        configure_environment(Path(tmp))
+        os.chdir(ROOT)
+        sys.path.insert(0, str(ROOT))
+
+        from app import main
+
+        main.startup()
+        # Фоновый рендер PDF после каждого импорта нагружал бы CPU во время замеров
+        main.resume_change_callbacks.remove(main.pdf_renderer.schedule_prerender)
+
+        runs = []
+        for size in args.sizes:
+            print(f"Размер резюме: {size} записей на раздел", file=sys.stderr)
+            runs.append(asyncio.run(run_size(main.app, size, args)))
+
+    return {
+        "commit": git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "db_async": os.getenv("CVAAS_DB_ASYNC", "0") == "1",
+        "runs": runs,
+    }
+
+
+def compare(result: dict, baseline: dict):
+    """
+    p50 и запросы в секунду относительно прошлого прогона (по совпадающим размерам).
+    """
+    previous = {run["size"]: run for run in baseline["runs"]}
+    print(f"Сравнение {result['commit']} с {baseline['commit']}:")
+    for run in result["runs"]:
+        old = previous.get(run["size"])
+        if old is None:
+            continue
+        for name, stats in run["endpoints"].items():
+            before = old["endpoints"].get(name)
+            if before is None:
+                continue
+            change = (stats["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0.0
+            print(f"  [{run['size']}] {name}: p50 {before['p50_ms']} → {stats['p50_ms']} мс ({change:+.0f}%), "
+                  f"{before['rps']} → {stats['rps']} rps")
+        for name, stats in run["micro"].items():
+            before = old["micro"].get(name)
+            if before is not None:
+                print(f"  [{run['size']}] {name}: {before['best_us']} → {stats['best_us']} мкс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10,500", type=lambda s: [int(x) for x in s.split(",")],
+                        help="записей на раздел резюме, через запятую")
+    parser.add_argument("--requests", type=int, default=200, help="запросов на сценарий")
+    parser.add_argument("--concurrency", type=int, default=8, help="одновременных запросов")
+    parser.add_argument("--output", type=Path, default=RESULTS_PATH)
+    parser.add_argument("--compare", type=Path, help="JSON прошлого прогона")
+    args = parser.parse_args()
+
+    result = benchmark(args)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(result, indent=2, ensure_ascii=False) + "\n")
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+    if args.compare:
+        compare(result, json.loads(args.compare.read_text()))
+
+
+if __name__ == "__main__":
+    main()
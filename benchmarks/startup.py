@@ -0,0 +1,99 @@
+"""
+Время импорта app.main по `python -X importtime`.
+
+    python benchmarks/startup.py                    # замер, результат в benchmarks/results/startup.json
+    python benchmarks/startup.py --check            # сравнить с benchmarks/startup_baseline.json
+    python benchmarks/startup.py --update-baseline  # записать новый baseline
+
+Импорт должен оставаться дешёвым: инициализация базы и прочая работа
+выполняются в lifespan, тяжёлые модули (alembic, pyotp, qrcode, Pillow,
+ijson) импортируются при первом использовании.
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_PATH = ROOT / "benchmarks" / "results" / "startup.json"
+BASELINE_PATH = ROOT / "benchmarks" / "startup_baseline.json"
+TARGET = "app.main"
+TOLERANCE = 0.25
+TOP_MODULES = 15
+
+
+def parse_importtime(stderr: str) -> dict:
+    """
+    {модуль: кумулятивное время, мкс} по строкам
+    "import time: self [us] | cumulative | imported package".
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.setdefault(name.strip(), int(cumulative))
+    return modules
+
+
+def measure_once() -> tuple[dict, float]:
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {TARGET}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(result.stderr), time.perf_counter() - started
+
+
+def measure(runs: int) -> dict:
+    measure_once()  # прогрев: .pyc и файловый кэш ОС
+    samples = [measure_once() for _ in range(runs)]
+    imports = [modules[TARGET] for modules, _ in samples]
+    walls = [wall for _, wall in samples]
+
+    # Самые дорогие модули берём из медианного прогона
+    median_run = sorted(samples, key=lambda s: s[0][TARGET])[len(samples) // 2][0]
+    top = sorted(
+        ((name, us) for name, us in median_run.items() if name != TARGET),
+        key=lambda item: item[1], reverse=True,
+    )[:TOP_MODULES]
+
+    return {
+        "python": platform.python_version(),
+        "runs": runs,
+        "import_ms": round(statistics.median(imports) / 1000, 1),
+        "process_ms": round(statistics.median(walls) * 1000, 1),
+        "top_modules_ms": {name: round(us / 1000, 1) for name, us in top},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--check", action="store_true", help="упасть, если импорт медленнее baseline")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    result = measure(args.runs)
+    RESULTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+    RESULTS_PATH.write_text(json.dumps(result, indent=2, ensure_ascii=False) + "\n")
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+    if args.update_baseline:
+        BASELINE_PATH.write_text(json.dumps(result, indent=2, ensure_ascii=False) + "\n")
+        return
+
+    if args.check:
+        baseline = json.loads(BASELINE_PATH.read_text())
+        limit = baseline["import_ms"] * (1 + TOLERANCE)
+        if result["import_ms"] > limit:
+            sys.exit(f"Импорт {TARGET}: {result['import_ms']} мс, baseline {baseline['import_ms']} мс (+{TOLERANCE:.0%} допуск)")
+        print(f"OK: {result['import_ms']} мс при baseline {baseline['import_ms']} мс")
+
+
+if __name__ == "__main__":
+    main()
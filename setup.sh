@@ -13,12 +13,16 @@ else
   echo "Файл .env уже существует, используем его"
 fi
 
-if [ ! -f resume.db ]; then
-  touch resume.db
-  chmod 644 resume.db
-  echo "✅ Создан пустой файл resume.db"
+mkdir -p data
+if [ -f resume.db ] && [ ! -f data/resume.db ]; then
+  # Раньше база монтировалась одним файлом из корня проекта
+  mv resume.db data/resume.db
+  for suffix in -wal -shm; do
+    [ -f "resume.db$suffix" ] && mv "resume.db$suffix" "data/resume.db$suffix"
+  done
+  echo "✅ resume.db перенесён в data/"
 else
-  echo "✅ resume.db уже существует"
+  echo "✅ Подготовлена папка data/ для базы"
 fi
 
 mkdir -p static/uploads
@@ -0,0 +1,49 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+TMP_DIR = Path(tempfile.mkdtemp(prefix="cvaas-tests-"))
+ADMIN_USER = "admin"
+ADMIN_PASSWORD = "secret"
+
+# Переменные окружения читаются при импорте app, поэтому задаются до него
+os.environ.update({
+    "CVAAS_DATABASE_URL": f"sqlite:///{TMP_DIR / 'resume.db'}",
+    "CVAAS_ADMIN_USER": ADMIN_USER,
+    "CVAAS_ADMIN_PASSWORD": ADMIN_PASSWORD,
+    "CVAAS_PDF_CACHE_DIR": str(TMP_DIR / "pdf"),
+    "CVAAS_TEMPLATE_CACHE_DIR": str(TMP_DIR / "jinja"),
+    "CVAAS_UPLOAD_TMP_DIR": str(TMP_DIR / "uploads"),
+    # Маленький лимит: проверка отказа без мегабайтных тел
+    "CVAAS_CERTIFICATE_MAX_BYTES": str(256 * 1024),
+    "CVAAS_PHOTO_MAX_BYTES": str(256 * 1024),
+})
+# Шаблоны и static/ приложение ищет относительно корня проекта
+os.chdir(ROOT)
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def client():
+    """
+    TestClient с выполненным входом и заполненным разделом «О себе».
+    """
+    from fastapi.testclient import TestClient
+
+    from app import main
+
+    # Фоновый рендер PDF после каждого сохранения тестам не нужен
+    main.resume_change_callbacks.remove(main.pdf_renderer.schedule_prerender)
+    with TestClient(main.app) as client:
+        response = client.post("/login", data={"username": ADMIN_USER, "password": ADMIN_PASSWORD},
+                               follow_redirects=False)
+        assert response.status_code == 303, response.text
+        client.post("/admin/info", data={"name": "Иван Петров", "about": "О себе"}, follow_redirects=False)
+        yield client
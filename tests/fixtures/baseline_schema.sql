@@ -0,0 +1,95 @@
+-- Схема базы, которую создавал create_all до перехода на Alembic (ревизия 004)
+CREATE TABLE experience (
+	id INTEGER NOT NULL, 
+	company VARCHAR, 
+	role VARCHAR, 
+	period VARCHAR, 
+	description TEXT, 
+	start_date VARCHAR, 
+	end_date VARCHAR, 
+	updated_at DATETIME, 
+	PRIMARY KEY (id)
+);
+CREATE TABLE skills (
+	id INTEGER NOT NULL, 
+	name VARCHAR, 
+	updated_at DATETIME, 
+	PRIMARY KEY (id)
+);
+CREATE TABLE info (
+	id INTEGER NOT NULL, 
+	field VARCHAR, 
+	value TEXT, 
+	updated_at DATETIME, 
+	PRIMARY KEY (id), 
+	UNIQUE (field)
+);
+CREATE TABLE courses (
+	id INTEGER NOT NULL, 
+	title VARCHAR, 
+	organization VARCHAR, 
+	year VARCHAR, 
+	updated_at DATETIME, 
+	PRIMARY KEY (id)
+);
+CREATE TABLE education (
+	id INTEGER NOT NULL, 
+	degree VARCHAR, 
+	institution VARCHAR, 
+	start_date VARCHAR, 
+	end_date VARCHAR, 
+	specialization VARCHAR, 
+	updated_at DATETIME, 
+	PRIMARY KEY (id)
+);
+CREATE TABLE languages (
+	id INTEGER NOT NULL, 
+	name VARCHAR, 
+	level VARCHAR, 
+	updated_at DATETIME, 
+	PRIMARY KEY (id)
+);
+CREATE TABLE projects (
+	id INTEGER NOT NULL, 
+	title VARCHAR, 
+	description VARCHAR, 
+	link VARCHAR, 
+	stack VARCHAR, 
+	updated_at DATETIME, 
+	PRIMARY KEY (id)
+);
+CREATE TABLE certificates (
+	id INTEGER NOT NULL, 
+	title VARCHAR, 
+	issuer VARCHAR, 
+	year INTEGER, 
+	file_path VARCHAR, 
+	link VARCHAR, 
+	updated_at DATETIME, 
+	PRIMARY KEY (id)
+);
+CREATE TABLE recommendations (
+	id INTEGER NOT NULL, 
+	name VARCHAR, 
+	company VARCHAR, 
+	quote VARCHAR, 
+	updated_at DATETIME, 
+	PRIMARY KEY (id)
+);
+CREATE TABLE admin (
+	id INTEGER NOT NULL, 
+	username VARCHAR, 
+	password_hash VARCHAR, 
+	totp_secret VARCHAR, 
+	twofa_enabled BOOLEAN, 
+	security_question VARCHAR, 
+	security_answer VARCHAR, 
+	PRIMARY KEY (id), 
+	UNIQUE (username)
+);
+
+INSERT INTO info (field, value, updated_at) VALUES
+    ('name', 'Иван Петров', '2024-05-01 10:00:00'),
+    ('about', 'О себе', '2024-05-01 10:00:00');
+INSERT INTO experience (company, role, period, description, start_date, end_date, updated_at) VALUES
+    ('Компания', 'Разработчик', '03.2019 — 06.2022', 'Разработка сервисов', '2019-03', '2022-06', '2024-05-01 10:00:00');
@@ -0,0 +1,32 @@
+import inspect
+
+import pytest
+
+from app import admin
+from app.cache import page_cache
+
+
+@pytest.mark.parametrize("handler", [
+    admin.update_info, admin.update_settings, admin.change_credentials, admin.recover_post,
+])
+def test_blocking_handlers_run_in_threadpool(handler):
+    # Коммит пересобирает снимок резюме, а bcrypt занимает CPU:
+    # в цикле событий это остановило бы все остальные запросы
+    assert not inspect.iscoroutinefunction(handler)
+
+
+def test_settings_form(client):
+    response = client.post("/admin/settings", data={"hidden_message": "Скоро вернусь"}, follow_redirects=False)
+    assert response.status_code == 303
+    page_cache.purge()
+    assert "Скоро вернусь" in client.get("/").text
+
+    client.post("/admin/settings", data={"template": "classic", "visibility": "public"}, follow_redirects=False)
+    assert "Скоро вернусь" not in client.get("/").text
+
+
+def test_change_credentials_checks_current_password(client):
+    response = client.post("/admin/change-credentials", data={
+        "current_password": "wrong", "new_username": "admin",
+    })
+    assert "Неверный текущий пароль" in response.text
@@ -0,0 +1,64 @@
+import pytest
+from jinja2 import DictLoader
+
+from app import assets, main, templating
+from app.cache import page_cache
+
+
+def test_unchanged_resume_is_not_modified(client):
+    etag = client.get("/preview").headers["etag"]
+    assert client.get("/preview", headers={"If-None-Match": etag}).status_code == 304
+
+
+@pytest.mark.parametrize("digest", ["manifest_digest", "templates_digest"])
+def test_deploy_changes_etag(client, monkeypatch, digest):
+    page_cache.purge()
+    etag = client.get("/").headers["etag"]
+
+    # Новые шаблоны или ассеты при той же версии и тех же данных
+    monkeypatch.setattr(main, digest, lambda: "changed")
+    page_cache.purge()
+    response = client.get("/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_digests_follow_sources(monkeypatch):
+    manifest = assets.manifest_digest()
+    monkeypatch.setattr(assets, "_manifest", {"style.css": "style.0123456789ab.css"})
+    monkeypatch.setattr(assets, "_manifest_digest", None)
+    assert assets.manifest_digest() != manifest
+
+    env = templating.templates.env
+    monkeypatch.setattr(env, "loader", DictLoader({"resume.html": "v1"}))
+    monkeypatch.setattr(templating, "_templates_digest", None)
+    first = templating.templates_digest()
+    monkeypatch.setattr(env, "loader", DictLoader({"resume.html": "v2"}))
+    monkeypatch.setattr(templating, "_templates_digest", None)
+    assert templating.templates_digest() != first
+
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_each_coding_has_own_etag(client, cached):
+    page_cache.purge()
+    if cached:
+        client.get("/", headers={"Accept-Encoding": "identity"})
+    etags = {}
+    for coding in ("br", "gzip", "identity"):
+        response = client.get("/", headers={"Accept-Encoding": coding})
+        assert response.headers.get("content-encoding", "identity") == coding
+        assert "Accept-Encoding" in response.headers["vary"]
+        etags[coding] = response.headers["etag"]
+    assert len(set(etags.values())) == 3
+
+    for coding, etag in etags.items():
+        response = client.get("/", headers={"Accept-Encoding": coding, "If-None-Match": etag})
+        assert response.status_code == 304
+
+
+def test_compressed_static_file_is_not_modified(client):
+    response = client.get("/static/style.css", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    etag = response.headers["etag"]
+    response = client.get("/static/style.css", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert response.status_code == 304
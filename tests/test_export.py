@@ -0,0 +1,33 @@
+import json
+
+from app import export
+from app.database import SessionLocal
+from app.models import Skill
+
+
+def test_export_reads_all_tables_from_one_snapshot(client, monkeypatch):
+    monkeypatch.setattr(export, "CHUNK_SIZE", 1)
+    chunks = export.iter_export("ndjson")
+    # Чтение уже началось: первая строка info отдана
+    first = next(chunks)
+
+    with SessionLocal() as db:
+        db.add(Skill(name="Добавлен во время экспорта"))
+        db.commit()
+
+    records = [json.loads(line) for line in (first + b"".join(chunks)).decode().splitlines()]
+    assert records[0]["section"] == "info"
+    assert not [r for r in records if r["section"] == "skills"]
+
+    with SessionLocal() as db:
+        db.query(Skill).delete()
+        db.commit()
+
+
+def test_export_formats_match(client):
+    pretty = json.loads(b"".join(export.iter_export("pretty")))
+    compact = json.loads(b"".join(export.iter_export("compact")))
+    ndjson = [json.loads(line) for line in b"".join(export.iter_export("ndjson")).decode().splitlines()]
+
+    assert pretty == compact
+    assert sum(len(rows) for rows in pretty.values()) == len(ndjson)
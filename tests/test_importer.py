@@ -0,0 +1,65 @@
+import io
+import json
+
+import pytest
+
+from app.database import SessionLocal
+from app.experience import month_ordinal
+from app.importer import import_resume
+from app.models import Experience, Skill
+
+INFO = [{"field": "name", "value": "Иван Петров"}, {"field": "about", "value": "О себе"}]
+JOB = {"company": "Компания", "role": "Разработчик", "start_date": "2020-01"}
+
+
+def run_import(data: dict, **kwargs) -> dict:
+    report = import_resume(io.BytesIO(json.dumps(data, ensure_ascii=False).encode()), **kwargs)
+    assert not report["errors"], report["errors"]
+    return report
+
+
+def experience_rows():
+    with SessionLocal() as db:
+        return [(e.period, e.description, e.start_month, e.end_month) for e in db.query(Experience).all()]
+
+
+@pytest.fixture
+def ongoing_job(client):
+    run_import({"info": INFO, "experience": [{**JOB, "period": "01.2020 — н.в.", "description": "Старое"}]})
+    yield
+    run_import({"info": INFO})
+
+
+def test_partial_merge_keeps_ongoing_period(ongoing_job):
+    run_import({"experience": [{**JOB, "description": "Новое"}]}, mode="merge")
+    assert experience_rows() == [("01.2020 — н.в.", "Новое", month_ordinal(2020, 1), None)]
+
+
+def test_merge_recomputes_months_from_merged_record(ongoing_job):
+    report = run_import({"experience": [{**JOB, "end_date": "2023-06"}]}, mode="merge")
+    assert report["diff"]["experience"]["updated"] == 1
+    assert experience_rows() == [("01.2020 — н.в.", "Старое", month_ordinal(2020, 1), month_ordinal(2023, 6))]
+
+
+def test_merge_of_same_record_is_unchanged(ongoing_job):
+    report = run_import({"experience": [JOB]}, mode="merge")
+    assert report["diff"]["experience"]["unchanged"] == 1
+
+
+@pytest.mark.parametrize("delete_missing", [False, True])
+def test_merge_reports_and_removes_duplicate_rows(client, delete_missing):
+    with SessionLocal() as db:
+        db.add_all([Skill(name="Python"), Skill(name="Python"), Skill(name="SQL")])
+        db.commit()
+
+    report = run_import({"skills": [{"name": "Python"}]}, mode="merge", delete_missing=delete_missing)
+    assert report["diff"]["skills"]["duplicates"] == 1
+    with SessionLocal() as db:
+        names = sorted(s.name for s in db.query(Skill).all())
+    if delete_missing:
+        assert report["diff"]["skills"]["deleted"] == 2
+        assert names == ["Python"]
+    else:
+        assert report["diff"]["skills"]["deleted"] == 0
+        assert names == ["Python", "Python", "SQL"]
+    run_import({"info": INFO})
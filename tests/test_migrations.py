@@ -0,0 +1,48 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+from alembic.script import ScriptDirectory
+
+from app.database import alembic_config
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_SCHEMA = Path(__file__).resolve().parent / "fixtures" / "baseline_schema.sql"
+
+# Приложение читает CVAAS_* при импорте, поэтому старт на другой базе —
+# в отдельном процессе
+OPEN_INDEX = """
+from fastapi.testclient import TestClient
+from app.main import app
+
+with TestClient(app) as client:
+    response = client.get("/")
+    assert response.status_code == 200, response.status_code
+    assert "Иван Петров" in response.text
+"""
+
+
+def test_unversioned_baseline_database_is_upgraded(tmp_path):
+    db_path = tmp_path / "resume.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript(BASELINE_SCHEMA.read_text())
+
+    env = dict(
+        os.environ,
+        CVAAS_DATABASE_URL=f"sqlite:///{db_path}",
+        CVAAS_ADMIN_USER="admin",
+        CVAAS_ADMIN_PASSWORD="secret",
+        CVAAS_PDF_CACHE_DIR=str(tmp_path / "pdf"),
+        CVAAS_TEMPLATE_CACHE_DIR=str(tmp_path / "jinja"),
+    )
+    subprocess.run([sys.executable, "-c", OPEN_INDEX], cwd=ROOT, env=env, check=True, timeout=120)
+
+    head = ScriptDirectory.from_config(alembic_config()).get_current_head()
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT version_num FROM alembic_version").fetchall() == [(head,)]
+        assert conn.execute("SELECT start_month, end_month FROM experience").fetchall() == [
+            (2019 * 12 + 2, 2022 * 12 + 5)
+        ]
+        assert conn.execute("SELECT count(*) FROM resume_snapshot").fetchone() == (1,)
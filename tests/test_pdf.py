@@ -0,0 +1,22 @@
+from pathlib import Path
+
+from app import pdf
+
+
+def test_pdf_from_previous_month_is_not_current(monkeypatch):
+    renderer = pdf.PdfRenderer(lambda: None)
+    monkeypatch.setattr(pdf, "this_month", lambda: "2026-09")
+    renderer._set_current("key", Path("key.pdf"), renderer.generation, pdf.this_month())
+    assert renderer.current == ("key", Path("key.pdf"))
+
+    # Сменился месяц: стаж "по н.в." вырос, PDF надо рендерить заново
+    monkeypatch.setattr(pdf, "this_month", lambda: "2026-10")
+    assert renderer.current is None
+
+
+def test_render_started_before_change_does_not_become_current():
+    renderer = pdf.PdfRenderer(lambda: None)
+    generation, month = renderer.generation, pdf.this_month()
+    renderer.generation += 1
+    renderer._set_current("old", Path("old.pdf"), generation, month)
+    assert renderer.current is None
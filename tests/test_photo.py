@@ -0,0 +1,52 @@
+import io
+import os
+import shutil
+
+import pytest
+from PIL import Image
+
+from app import admin
+from app.photo import MAX_PHOTO_BYTES, PHOTO_DIR, PHOTO_MANIFEST, PHOTO_PATH, load_photo_manifest
+from app.uploads import FORM_OVERHEAD
+
+
+@pytest.fixture(autouse=True)
+def clean_photo():
+    yield
+    shutil.rmtree(PHOTO_DIR, ignore_errors=True)
+    PHOTO_PATH.unlink(missing_ok=True)
+    PHOTO_MANIFEST.unlink(missing_ok=True)
+
+
+def upload_photo(client):
+    data = io.BytesIO()
+    Image.new("RGB", (300, 300), tuple(os.urandom(3))).save(data, "PNG")
+    response = client.post("/admin/upload-photo", files={"photo": ("me.png", data.getvalue(), "image/png")},
+                           follow_redirects=False)
+    assert response.status_code == 303, response.text
+    return load_photo_manifest()["hash"]
+
+
+def test_old_variants_removed_after_cache_purge(client, monkeypatch):
+    old = upload_photo(client)
+    seen = []
+    resume_changed = admin.resume_changed
+
+    def check():
+        # Кэш страниц ещё не сброшен: старые варианты должны быть на месте
+        seen.extend(p.name for p in PHOTO_DIR.iterdir() if p.name.startswith(f"{old}-"))
+        resume_changed()
+
+    monkeypatch.setattr(admin, "resume_changed", check)
+    new = upload_photo(client)
+    assert seen
+    assert all(p.name.startswith(f"{new}-") for p in PHOTO_DIR.iterdir())
+
+
+def test_oversized_photo_rejected_before_parsing(client, monkeypatch):
+    monkeypatch.setattr(admin, "receive_upload", None)
+    body = b"0" * (MAX_PHOTO_BYTES + FORM_OVERHEAD + 1024)
+    response = client.post("/admin/upload-photo", content=body,
+                           headers={"Content-Type": "multipart/form-data; boundary=limit-test"})
+    assert response.status_code == 413
+    assert not PHOTO_PATH.exists()
@@ -0,0 +1,34 @@
+import pytest
+
+from app.cache import page_cache
+from app.profiler import QUERY_BUDGETS, QueryBudgetExceeded, check_query_budgets, sql_profiler
+
+
+@pytest.mark.parametrize("endpoint", ["GET /", "GET /preview", "GET /admin/dashboard"])
+def test_read_path_budget(client, endpoint):
+    # Без кэша страницы: считаем запросы самого рендера
+    page_cache.purge()
+    check_query_budgets(client, {endpoint: QUERY_BUDGETS[endpoint]})
+
+
+def test_all_budgets(client):
+    check_query_budgets(client, requests={
+        "POST /admin/info": {"data": {"name": "Иван Петров", "about": "О себе"}},
+    })
+
+
+def test_budget_violation_is_reported(client):
+    with pytest.raises(QueryBudgetExceeded, match="GET /admin/export-json"):
+        with sql_profiler.assert_max_queries(1):
+            client.get("/admin/export-json")
+
+
+def test_sql_headers_only_on_complete_responses(client, monkeypatch):
+    monkeypatch.setattr(sql_profiler, "enabled", True)
+    page_cache.purge()
+    assert int(client.get("/").headers["x-sql-queries"]) >= 1
+
+    # Запросы потокового экспорта идут уже после отправки заголовков
+    response = client.get("/admin/export-json?format=ndjson")
+    assert response.status_code == 200
+    assert "x-sql-queries" not in response.headers
@@ -0,0 +1,36 @@
+from datetime import date
+
+from app import main, snapshot
+from app.database import ReadSessionLocal, SessionLocal
+from app.models import Experience, ResumeSnapshot
+
+
+class NextMonth(date):
+    @classmethod
+    def today(cls):
+        return cls(2100, 1, 15)
+
+
+def test_month_rollover_is_read_only(client, monkeypatch):
+    with SessionLocal() as db:
+        db.add(Experience(company="Текущая", role="DevOps", period="01.2099 — н.в."))
+        db.commit()
+    try:
+        with ReadSessionLocal() as db:
+            before = snapshot.get_snapshot(db)
+            stored = db.get(ResumeSnapshot, snapshot.SNAPSHOT_ID).data
+
+        # Прошёл месяц: в базе ничего не менялось, а стаж "по н.в." вырос
+        monkeypatch.setattr(snapshot, "date", NextMonth)
+        with ReadSessionLocal() as db:
+            after = snapshot.get_snapshot(db)
+            assert db.get(ResumeSnapshot, snapshot.SNAPSHOT_ID).data == stored
+
+        assert after["total_experience"] == "1 год"
+        assert after["total_experience"] != before["total_experience"]
+        assert main.resume_validators(after)[0] != main.resume_validators(before)[0]
+        assert after["built_at"].date() == date(2100, 1, 1)
+    finally:
+        with SessionLocal() as db:
+            db.query(Experience).delete()
+            db.commit()
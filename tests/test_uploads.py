@@ -0,0 +1,154 @@
+import errno
+import io
+import json
+import os
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from app import admin
+from app.database import SessionLocal
+from app.models import Certificate
+from app import uploads
+from app.uploads import FORM_OVERHEAD, MAX_CERTIFICATE_BYTES, UPLOAD_DIR, UPLOAD_TMP_DIR, thumbnail_path
+
+
+def upload_certificate(client, title: str, color=None) -> str:
+    # Случайный цвет — своё содержимое и свой хэш у каждого теста
+    image = Image.new("RGB", (64, 64), color or tuple(os.urandom(3)))
+    data = io.BytesIO()
+    image.save(data, "PNG")
+    response = client.post("/admin/certificates/add", data={"title": title, "issuer": "Вендор", "year": 2024},
+                           files={"file": ("cert.png", data.getvalue(), "image/png")}, follow_redirects=False)
+    assert response.status_code == 303, response.text
+    with SessionLocal() as db:
+        return db.query(Certificate).filter(Certificate.title == title).one().file_path
+
+
+def stored(file_url: str) -> bool:
+    return Path(file_url.lstrip("/")).exists()
+
+
+def reset(client):
+    client.post("/admin/reset", follow_redirects=False)
+    client.post("/admin/info", data={"name": "Иван Петров", "about": "О себе"}, follow_redirects=False)
+
+
+@pytest.fixture(autouse=True)
+def clean_resume(client):
+    # Загрузки пишутся в static/uploads проекта: сброс убирает их за тестом
+    yield
+    reset(client)
+
+
+def test_replace_import_releases_dropped_files(client):
+    kept = upload_certificate(client, "Остаётся")
+    dropped = upload_certificate(client, "Удаляется")
+    assert stored(dropped) and thumbnail_path(dropped).exists()
+
+    resume = {
+        "info": [{"field": "name", "value": "Иван Петров"}, {"field": "about", "value": "О себе"}],
+        "certificates": [{"title": "Остаётся", "issuer": "Вендор", "year": 2024, "file_path": kept}],
+    }
+    response = client.post("/admin/import-json", data={"mode": "replace"},
+                           files={"json_file": ("resume.json", json.dumps(resume), "application/json")})
+    assert response.status_code == 200
+
+    assert stored(kept)
+    assert not stored(dropped) and not thumbnail_path(dropped).exists()
+
+
+def test_reset_releases_all_files(client):
+    color = tuple(os.urandom(3))
+    shared = upload_certificate(client, "Первый", color)
+    assert upload_certificate(client, "Второй", color) == shared
+
+    reset(client)
+
+    assert not stored(shared) and not thumbnail_path(shared).exists()
+
+
+def test_shared_file_kept_until_last_certificate(client):
+    color = tuple(os.urandom(3))
+    shared = upload_certificate(client, "Копия 1", color)
+    upload_certificate(client, "Копия 2", color)
+
+    with SessionLocal() as db:
+        first, second = db.query(Certificate).filter(Certificate.file_path == shared).all()
+    client.get(f"/admin/certificates/delete/{first.id}", follow_redirects=False)
+    assert stored(shared)
+    client.get(f"/admin/certificates/delete/{second.id}", follow_redirects=False)
+    assert not stored(shared)
+
+
+def multipart_body(size: int, boundary: str = "limit-test"):
+    yield (f"--{boundary}\r\nContent-Disposition: form-data; name=\"title\"\r\n\r\nБольшой\r\n"
+           f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"big.pdf\"\r\n"
+           f"Content-Type: application/pdf\r\n\r\n%PDF-").encode()
+    for _ in range(size // (64 * 1024)):
+        yield b"0" * (64 * 1024)
+    yield f"\r\n--{boundary}--\r\n".encode()
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_oversized_upload_rejected_before_parsing(client, monkeypatch, chunked):
+    # До обработчика запрос доходить не должен: форма не разбирается
+    monkeypatch.setattr(admin, "receive_upload", None)
+    size = MAX_CERTIFICATE_BYTES + FORM_OVERHEAD + 128 * 1024
+    body = multipart_body(size)
+    if not chunked:
+        body = b"".join(body)
+    response = client.post("/admin/certificates/add", content=body,
+                           headers={"Content-Type": "multipart/form-data; boundary=limit-test"})
+    assert response.status_code == 413
+    with SessionLocal() as db:
+        assert not db.query(Certificate).filter(Certificate.title == "Большой").count()
+
+
+def test_rejected_upload_never_reaches_public_dir(client):
+    response = client.post("/admin/certificates/add", data={"title": "Не тот тип", "issuer": "", "year": 2024},
+                           files={"file": ("cert.exe", b"MZ" + b"0" * 1024, "application/octet-stream")})
+    assert response.status_code == 415
+    assert not [p for p in UPLOAD_DIR.rglob(".*") if p.is_file()]
+    assert not list(UPLOAD_TMP_DIR.iterdir())
+
+
+def test_move_into_other_filesystem(tmp_path, monkeypatch):
+    src = tmp_path / "upload.tmp"
+    src.write_bytes(b"data")
+    dest_dir = tmp_path / "files"
+    dest_dir.mkdir()
+    replace = os.replace
+
+    def cross_device(a, b):
+        if Path(a) == src:
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        return replace(a, b)
+
+    monkeypatch.setattr(uploads.os, "replace", cross_device)
+    uploads.move_into(str(src), dest_dir / "file.pdf")
+    assert (dest_dir / "file.pdf").read_bytes() == b"data"
+    assert not src.exists()
+    assert [p.name for p in dest_dir.iterdir()] == ["file.pdf"]
+
+
+def test_file_stored_before_commit_survives_release(client):
+    color = tuple(os.urandom(3))
+    shared = upload_certificate(client, "Старый", color)
+    image = io.BytesIO()
+    Image.new("RGB", (64, 64), color).save(image, "PNG")
+    tmp_path = UPLOAD_TMP_DIR / "same.upload"
+    tmp_path.write_bytes(image.getvalue())
+
+    # Новая загрузка того же файла ещё не закоммичена, а старый сертификат удаляют
+    assert uploads.store_upload(str(tmp_path), Path(shared).stem, "png") == shared
+    with SessionLocal() as db:
+        db.query(Certificate).filter(Certificate.title == "Старый").delete()
+        db.commit()
+        uploads.release_files(db, [shared])
+        assert stored(shared)
+
+        # Сертификат так и не сохранился: после finish_upload файл без ссылок удаляется
+        uploads.finish_upload(db, shared)
+    assert not stored(shared)